@@ -0,0 +1,272 @@
+# Columnar archive for historical tickets (CSV backend).
+#
+# Compaction moves the oldest rows out of data/submissions.csv into monthly
+# Parquet segments under data/archive/:
+#
+#   tickets-2024-01.1234.parquet  zstd-compressed, category/priority dictionary-
+#                                 encoded; named after the segment's last id
+#   manifest.json             per-segment row counts, id/time ranges and distinct
+#                             category/priority values, plus the archived row total
+#
+# Queries only read the segments whose month overlaps the selected date range,
+# so memory and load time follow the window rather than total retention.
+#
+# Ticket ids stay stable across compaction: ids are global row numbers, every
+# segment stores its rows' ids, and the live CSV's rows are numbered from
+# manifest["archived_rows"]. Only a prefix of the CSV is ever archived.
+#
+# Segment files are never rewritten in place: a month that gets late rows is
+# written under a new name, and the file it replaces is deleted by the next
+# compaction, so readers holding the previous manifest can still open it.
+#
+# Parquet support needs pyarrow. Without it compaction is disabled and the CSV
+# simply keeps growing as before. pandas/pyarrow are imported only when a
+# segment is actually read or written.
+
+from __future__ import annotations
+
+import importlib.util
+import json
+import os
+import threading
+from collections import OrderedDict
+from datetime import date, timedelta
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# pandas' Parquet engine (optional)
+HAVE_PYARROW = importlib.util.find_spec("pyarrow") is not None
+
+from search_index import SEARCH_FIELDS, TokenIndex
+
+MANIFEST_NAME = "manifest.json"
+UNDATED = "undated"  # rows whose timestamp could not be parsed
+CACHED_SEGMENTS = 12
+
+
+def month_key(ts: pd.Timestamp) -> str:
+    import pandas as pd
+    return UNDATED if pd.isna(ts) else f"{ts.year:04d}-{ts.month:02d}"
+
+
+def month_range(key: str) -> Tuple[date, date]:
+    """First and last day of a "YYYY-MM" segment key."""
+    year, month = int(key[:4]), int(key[5:7])
+    first = date(year, month, 1)
+    nxt = date(year + (month == 12), month % 12 + 1, 1)
+    return first, nxt - timedelta(days=1)
+
+
+def _write_json(path: str, data: dict) -> None:
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=1, sort_keys=True)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+class Archive:
+    def __init__(self, directory: str, headers: List[str]):
+        self.directory = directory
+        self.headers = list(headers)
+        self.manifest_path = os.path.join(directory, MANIFEST_NAME)
+        self._lock = threading.Lock()
+        self._manifest: dict = {"archived_rows": 0, "segments": {}, "pending_trim": None}
+        self._manifest_sig: Optional[Tuple[int, int]] = None
+        # key -> (file signature, frame indexed by id, token index or None)
+        self._segments: "OrderedDict[str, list]" = OrderedDict()
+
+    @property
+    def enabled(self) -> bool:
+        return HAVE_PYARROW
+
+    # --- manifest ---
+    def manifest(self) -> dict:
+        """Current manifest, re-read only when another process rewrote it."""
+        try:
+            st_ = os.stat(self.manifest_path)
+        except FileNotFoundError:
+            return self._manifest
+        sig = (st_.st_mtime_ns, st_.st_size)
+        with self._lock:
+            if sig != self._manifest_sig:
+                with open(self.manifest_path, encoding="utf-8") as f:
+                    self._manifest = json.load(f)
+                self._manifest_sig = sig
+            return self._manifest
+
+    def version(self) -> Optional[Tuple[int, int]]:
+        self.manifest()
+        return self._manifest_sig
+
+    @property
+    def rows(self) -> int:
+        return self.manifest()["archived_rows"]
+
+    def _save_manifest(self, manifest: dict) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        _write_json(self.manifest_path, manifest)
+        self.manifest()
+
+    def clear_pending(self) -> None:
+        manifest = dict(self.manifest(), pending_trim=None)
+        self._save_manifest(manifest)
+
+    # --- segment selection ---
+    def keys_for(self, date_from: Optional[date] = None, date_to: Optional[date] = None) -> List[str]:
+        """Segments that can hold tickets in the inclusive date range."""
+        keys = []
+        for key in sorted(self.manifest()["segments"]):
+            if key == UNDATED:
+                if date_from is None and date_to is None:
+                    keys.append(key)
+                continue
+            first, last = month_range(key)
+            if (date_to is None or first <= date_to) and (date_from is None or last >= date_from):
+                keys.append(key)
+        return keys
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, self.manifest()["segments"][key]["file"])
+
+    def _read(self, key: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        if not self.enabled:
+            raise RuntimeError("Reading archived tickets needs pyarrow (pip install pyarrow).")
+        import pandas as pd
+        return pd.read_parquet(self._path(key), engine="pyarrow", columns=columns)
+
+    def _entry(self, key: str) -> list:
+        path = self._path(key)
+        st_ = os.stat(path)
+        sig = (st_.st_mtime_ns, st_.st_size)
+        with self._lock:
+            entry = self._segments.get(key)
+            if entry is not None and entry[0] == sig:
+                self._segments.move_to_end(key)
+                return entry
+        df = self._read(key).set_index("id")
+        df.index.name = None
+        entry = [sig, df, None]
+        with self._lock:
+            self._segments[key] = entry
+            while len(self._segments) > CACHED_SEGMENTS:
+                self._segments.popitem(last=False)
+        return entry
+
+    def load_segment(self, key: str) -> pd.DataFrame:
+        """Tickets in one segment, indexed by ticket id. Callers must not mutate it."""
+        return self._entry(key)[1]
+
+    def segment_index(self, key: str) -> TokenIndex:
+        entry = self._entry(key)
+        if entry[2] is None:
+            index = TokenIndex()
+            df = entry[1]
+            fields = [c for c in SEARCH_FIELDS if c in df.columns]
+            for doc_id, *texts in df[fields].itertuples(name=None):
+                index.add(doc_id, texts)
+            entry[2] = index
+        return entry[2]
+
+    # --- whole-archive lookups ---
+    def find(self, ticket_id: int) -> Optional[pd.Series]:
+        for key, seg in self.manifest()["segments"].items():
+            if seg["first_id"] <= ticket_id <= seg["last_id"]:
+                df = self.load_segment(key)
+                if ticket_id in df.index:
+                    return df.loc[ticket_id]
+        return None
+
+    def bounds(self) -> Tuple[Optional[pd.Timestamp], Optional[pd.Timestamp]]:
+        dated = [s for k, s in self.manifest()["segments"].items() if k != UNDATED]
+        if not dated:
+            return None, None
+        import pandas as pd
+        return (pd.Timestamp(min(s["min_ts"] for s in dated)),
+                pd.Timestamp(max(s["max_ts"] for s in dated)))
+
+    def distinct(self, column: str) -> set:
+        values = set()
+        for seg in self.manifest()["segments"].values():
+            values.update(seg.get("distinct", {}).get(column, []))
+        return values
+
+    def records(self) -> Iterable[Tuple[str, str, str, str]]:
+        """(timestamp, email, category, priority) for every archived ticket."""
+        for key in sorted(self.manifest()["segments"]):
+            df = self._read(key, columns=["timestamp", "email", "category", "priority"])
+            stamps = df["timestamp"].dt.strftime("%Y-%m-%dT%H:%M:%SZ").fillna("")
+            yield from zip(stamps, df["email"].astype(str).str.strip(),
+                           df["category"].astype(str), df["priority"].astype(str))
+
+    def iter_rows(self) -> Iterable[Tuple[int, List[str]]]:
+        """(ticket id, raw row in header order) for every archived ticket (for migrations).
+
+        Segments come month by month, so ids are only ascending within one.
+        """
+        for key in sorted(self.manifest()["segments"]):
+            df = self._read(key).sort_values("id", kind="stable")
+            df["timestamp"] = df["timestamp"].dt.strftime("%Y-%m-%dT%H:%M:%SZ").fillna("")
+            rows = df[self.headers].astype(str).itertuples(index=False, name=None)
+            yield from zip(df["id"].astype(int).tolist(), map(list, rows))
+
+    # --- compaction ---
+    def append(self, df: pd.DataFrame, pending_trim: dict) -> None:
+        """Archive `df` (normalized rows indexed by ticket id) into monthly segments.
+
+        The manifest is saved with `pending_trim` set so that, if the process
+        dies before the CSV is trimmed, the next compaction finishes the job
+        instead of archiving the same rows twice.
+        """
+        if not self.enabled:
+            raise RuntimeError("Archiving tickets needs pyarrow (pip install pyarrow).")
+        import pandas as pd
+        os.makedirs(self.directory, exist_ok=True)
+        manifest = json.loads(json.dumps(self.manifest()))  # deep copy
+        rows = df.reset_index(names="id")
+        for key, part in rows.groupby(rows["timestamp"].map(month_key), sort=True):
+            seg = manifest["segments"].get(key)
+            if seg is not None:  # late rows for an already archived month
+                old = self._read(key)
+                part = pd.concat([old, part], ignore_index=True).sort_values("id", kind="stable")
+            part = part[["id"] + self.headers].reset_index(drop=True)
+            for col in ("category", "priority"):
+                part[col] = part[col].astype(str).astype("category")
+            for col in self.headers:
+                if col not in ("timestamp", "category", "priority"):
+                    part[col] = part[col].astype(str)
+
+            name = f"tickets-{key}.{int(part['id'].max())}.parquet"
+            tmp = os.path.join(self.directory, name + ".tmp")
+            part.to_parquet(tmp, engine="pyarrow", compression="zstd", index=False)
+            os.replace(tmp, os.path.join(self.directory, name))
+
+            ts = part["timestamp"].dropna()
+            manifest["segments"][key] = {
+                "file": name,
+                "rows": int(len(part)),
+                "first_id": int(part["id"].min()),
+                "last_id": int(part["id"].max()),
+                "min_ts": ts.min().isoformat() if len(ts) else None,
+                "max_ts": ts.max().isoformat() if len(ts) else None,
+                "distinct": {c: sorted(part[c].cat.categories) for c in ("category", "priority")},
+            }
+        manifest["archived_rows"] = int(manifest["archived_rows"] + len(df))
+        manifest["pending_trim"] = pending_trim
+        self._save_manifest(manifest)
+
+    def remove_unlisted(self) -> None:
+        """Delete segment files the manifest no longer refers to (compaction lock held)."""
+        if not os.path.isdir(self.directory):
+            return
+        listed = {seg["file"] for seg in self.manifest()["segments"].values()}
+        for name in os.listdir(self.directory):
+            if name.startswith("tickets-") and name.endswith(".parquet") and name not in listed:
+                os.remove(os.path.join(self.directory, name))
+
+    def stats(self) -> Dict[str, int]:
+        manifest = self.manifest()
+        return {"archived": manifest["archived_rows"], "segments": len(manifest["segments"])}
@@ -0,0 +1,166 @@
+# Attachment storage for SupportDesk.
+#
+# Uploads are streamed to disk in chunks while being hashed, so a large log or
+# zip never needs a second in-memory copy, and per-type size limits are
+# enforced as bytes arrive. Files are content-addressed:
+#
+#   uploads/blobs/<sha256[:2]>/<sha256>
+#
+# so the same screenshot uploaded a hundred times is stored once. The ticket's
+# attachment_file column holds a reference "<sha256>/<original name>", which
+# maps the ticket to its blob and keeps the name for downloads. Older tickets
+# still hold a plain file name under uploads/; resolve() handles both.
+#
+# After a ticket is saved, a background job (see jobs.py) re-hashes the blob and
+# checks its leading bytes against the claimed file type. A blob that fails is
+# left in place with a "<blob>.<ext>.rejected" note next to it (per extension,
+# since one blob can be uploaded under several names), and the staff tab
+# refuses to offer it for download under that name.
+
+import hashlib
+import os
+import re
+import tempfile
+from typing import BinaryIO, Optional, Tuple
+
+ATTACHMENT_TYPES = ["png", "jpg", "jpeg", "gif", "pdf", "txt", "log", "csv", "zip"]
+
+MB = 1024 * 1024
+SIZE_LIMITS = {
+    "png": 10 * MB, "jpg": 10 * MB, "jpeg": 10 * MB, "gif": 10 * MB,
+    "pdf": 20 * MB,
+    "txt": 5 * MB, "log": 25 * MB, "csv": 25 * MB,
+    "zip": 50 * MB,
+}
+DEFAULT_LIMIT = 10 * MB
+CHUNK_SIZE = 1 * MB
+
+_REF_RE = re.compile(r"^([0-9a-f]{64})/(.+)$")
+
+# Leading bytes each binary type must start with; text types must not contain NUL
+MAGIC = {
+    "png": (b"\x89PNG\r\n\x1a\n",),
+    "jpg": (b"\xff\xd8\xff",),
+    "jpeg": (b"\xff\xd8\xff",),
+    "gif": (b"GIF87a", b"GIF89a"),
+    "pdf": (b"%PDF-",),
+    "zip": (b"PK\x03\x04", b"PK\x05\x06"),  # empty archives have only the end record
+}
+TEXT_TYPES = {"txt", "log", "csv"}
+SNIFF_BYTES = 8192
+
+
+class AttachmentTooLarge(ValueError):
+    """Raised while streaming an upload that exceeds its type's size limit."""
+
+
+def size_limit(filename: str) -> int:
+    ext = os.path.splitext(filename)[1].lstrip(".").lower()
+    return SIZE_LIMITS.get(ext, DEFAULT_LIMIT)
+
+
+def safe_name(filename: str) -> str:
+    return os.path.basename(filename.replace("\\", "/")).replace(" ", "_") or "attachment"
+
+
+def blob_path(upload_dir: str, digest: str) -> str:
+    return os.path.join(upload_dir, "blobs", digest[:2], digest)
+
+
+def store_upload(fileobj: BinaryIO, filename: str, upload_dir: str) -> str:
+    """Stream `fileobj` into the blob store and return its attachment reference."""
+    limit = size_limit(filename)
+    tmp_dir = os.path.join(upload_dir, "tmp")
+    os.makedirs(tmp_dir, exist_ok=True)
+
+    digest = hashlib.sha256()
+    size = 0
+    fd, tmp_path = tempfile.mkstemp(dir=tmp_dir)
+    try:
+        with os.fdopen(fd, "wb") as out:
+            if hasattr(fileobj, "seek"):
+                fileobj.seek(0)
+            while True:
+                chunk = fileobj.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > limit:
+                    raise AttachmentTooLarge(
+                        f"{safe_name(filename)} is larger than the {limit // MB} MB limit for this file type."
+                    )
+                digest.update(chunk)
+                out.write(chunk)
+            out.flush()
+            os.fsync(out.fileno())
+
+        hexdigest = digest.hexdigest()
+        final = blob_path(upload_dir, hexdigest)
+        if os.path.exists(final):
+            os.unlink(tmp_path)  # already stored: dedup
+        else:
+            os.makedirs(os.path.dirname(final), exist_ok=True)
+            os.replace(tmp_path, final)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    return f"{hexdigest}/{safe_name(filename)}"
+
+
+def resolve(upload_dir: str, ref: str) -> Tuple[str, str]:
+    """(path on disk, download name) for an attachment_file value."""
+    m = _REF_RE.match(ref)
+    if m:
+        return blob_path(upload_dir, m.group(1)), m.group(2)
+    # Legacy: timestamped file stored directly under uploads/
+    name = os.path.basename(ref)
+    return os.path.join(upload_dir, name), name
+
+
+def validate(path: str, filename: str, expected_digest: Optional[str] = None) -> Optional[str]:
+    """Why the stored file is not what it claims to be, or None if it checks out."""
+    ext = os.path.splitext(filename)[1].lstrip(".").lower()
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        head = fh.read(SNIFF_BYTES)
+        digest.update(head)
+        for chunk in iter(lambda: fh.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    if expected_digest is not None and digest.hexdigest() != expected_digest:
+        return "content does not match its hash (corrupted on disk)"
+    if ext in MAGIC and not head.startswith(MAGIC[ext]):
+        return f"content is not a valid .{ext} file"
+    if ext in TEXT_TYPES and b"\x00" in head:
+        return f"binary content in a .{ext} file"
+    return None
+
+
+def _rejection_path(path: str, filename: str) -> str:
+    ext = os.path.splitext(filename)[1].lstrip(".").lower() or "none"
+    return f"{path}.{ext}.rejected"
+
+
+def reject(path: str, filename: str, reason: str) -> None:
+    with open(_rejection_path(path, filename), "w", encoding="utf-8") as f:
+        f.write(reason)
+
+
+def rejection(path: str, filename: str) -> Optional[str]:
+    """Reason the file failed validation, or None (unchecked or valid)."""
+    try:
+        with open(_rejection_path(path, filename), encoding="utf-8") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def ref_digest(ref: str) -> Optional[str]:
+    """sha256 of a content-addressed reference (None for legacy file names)."""
+    m = _REF_RE.match(ref)
+    return m.group(1) if m else None
+
+
+def display_name(ref: str) -> str:
+    m = _REF_RE.match(ref)
+    return f"{m.group(2)} ({m.group(1)[:8]})" if m else ref
@@ -0,0 +1,115 @@
+# Startup / rerun timing for the public submit form.
+#
+# Each trial runs in a fresh interpreter with an empty working directory, so
+# the first script run pays every import and one-time bootstrap cost just like
+# a new server process. The child drives support.py with Streamlit's AppTest
+# (no browser, no staff login) and reports:
+#
+#   cold      first script run after `import streamlit`
+#   rerun     median of --reruns plain reruns (widget interaction)
+#   submit    one filled-in submission, including the rerun that clears the form
+#   pandas    whether pandas got imported by a submit-only session
+#   header    size of the header markdown sent on every rerun
+#
+#   python bench/startup.py
+#   python bench/startup.py --script /tmp/old/support.py   # compare another checkout
+#
+# (for the second form: git worktree add /tmp/old <rev>)
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def child(script: str, backend: str, reruns: int) -> dict:
+    t0 = time.perf_counter()
+    from streamlit.testing.v1 import AppTest
+    import_s = time.perf_counter() - t0
+
+    at = AppTest.from_file(script, default_timeout=120)
+    at.secrets["STORAGE_BACKEND"] = backend  # no STAFF_PASSWORD: public session only
+    t0 = time.perf_counter()
+    at.run()
+    cold_s = time.perf_counter() - t0
+    if at.exception:
+        raise SystemExit(f"script raised: {at.exception}")
+
+    rerun_times = []
+    for _ in range(reruns):
+        t0 = time.perf_counter()
+        at.run()
+        rerun_times.append(time.perf_counter() - t0)
+
+    fields = {"Full name": "Bench User", "Email": "bench@example.com", "Subject": "Startup bench"}
+    for widget in at.text_input:
+        if widget.label in fields:
+            widget.input(fields[widget.label])
+    at.text_area[0].input("Timing a submission from the public form.")
+    at.checkbox[0].check()
+    t0 = time.perf_counter()
+    next(b for b in at.button if b.label == "Submit ticket").click().run()
+    submit_s = time.perf_counter() - t0
+    if at.exception or at.error:
+        raise SystemExit(f"submit failed: {at.exception or [e.value for e in at.error]}")
+
+    header = max((len(m.value.encode("utf-8")) for m in at.markdown if "class=\"header\"" in m.value),
+                 default=0)
+    return {
+        "import_s": import_s,
+        "cold_s": cold_s,
+        "rerun_s": statistics.median(rerun_times) if rerun_times else 0.0,
+        "submit_s": submit_s,
+        "pandas": "pandas" in sys.modules,
+        "header_bytes": header,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Startup and rerun timing for the submit form")
+    parser.add_argument("--script", default=os.path.join(ROOT, "support.py"))
+    parser.add_argument("--trials", type=int, default=3, help="fresh processes to start")
+    parser.add_argument("--reruns", type=int, default=20, help="reruns timed per process")
+    parser.add_argument("--backend", choices=["csv", "sqlite"], default="csv")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    script = os.path.abspath(args.script)
+
+    if args.child:
+        print(json.dumps(child(script, args.backend, args.reruns)))
+        return 0
+
+    results = []
+    for _ in range(args.trials):
+        with tempfile.TemporaryDirectory(prefix="supportdesk-startup-") as cwd:
+            proc = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--child", "--script", script,
+                 "--reruns", str(args.reruns), "--backend", args.backend],
+                cwd=cwd, capture_output=True, text=True,
+            )
+        if proc.returncode != 0:
+            sys.stderr.write(proc.stderr)
+            return proc.returncode
+        results.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+
+    def ms(key: str) -> str:
+        return f"{statistics.median(r[key] for r in results) * 1000:8.1f} ms"
+
+    print(f"script={script} backend={args.backend} trials={args.trials} reruns={args.reruns}")
+    print(f"import streamlit {ms('import_s')}")
+    print(f"cold first run   {ms('cold_s')}")
+    print(f"rerun (median)   {ms('rerun_s')}")
+    print(f"submit + clear   {ms('submit_s')}")
+    print(f"pandas imported  {any(r['pandas'] for r in results)}")
+    print(f"header markdown  {results[0]['header_bytes']:,} bytes per rerun")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
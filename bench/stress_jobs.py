@@ -0,0 +1,144 @@
+# Bursty-load test for the post-submit job pipeline.
+#
+# Fires bursts of concurrent submissions that do what the submit handler does
+# (durable append through the TicketWriter, then queue the post-submit jobs)
+# while a worker pool drains the queue into a throwaway local SMTP sink.
+# Prints submit latency per burst size (it should stay flat: the handler
+# never waits for email or attachment checks), how long the queue took to
+# drain, and checks every acknowledgement arrived.
+#
+#   python bench/stress_jobs.py
+#   python bench/stress_jobs.py --bursts 10,100,400 --workers 4 --backend sqlite
+
+import argparse
+import io
+import os
+import random
+import socketserver
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from attachments import store_upload  # noqa: E402
+from jobs import JobQueue, JobWorkers  # noqa: E402
+from perf import percentile  # noqa: E402
+from pipeline import enqueue_post_submit, make_handlers  # noqa: E402
+from storage import CSV_HEADERS, open_store  # noqa: E402
+from ticket_writer import TicketWriter  # noqa: E402
+
+
+class SmtpSink(socketserver.ThreadingTCPServer):
+    """Just enough SMTP to accept and count messages."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), SmtpHandler)
+        self.received = 0
+        self.lock = threading.Lock()
+
+
+class SmtpHandler(socketserver.StreamRequestHandler):
+    def reply(self, line: str) -> None:
+        self.wfile.write(line.encode("ascii") + b"\r\n")
+
+    def handle(self) -> None:
+        self.reply("220 sink ready")
+        for raw in self.rfile:
+            cmd = raw.decode("utf-8", "replace").strip().upper()
+            if cmd.startswith("EHLO") or cmd.startswith("HELO"):
+                self.reply("250 sink")
+            elif cmd == "DATA":
+                self.reply("354 end with .")
+                for line in self.rfile:
+                    if line in (b".\r\n", b".\n"):
+                        break
+                with self.server.lock:
+                    self.server.received += 1
+                self.reply("250 queued")
+            elif cmd == "QUIT":
+                self.reply("221 bye")
+                return
+            else:  # MAIL, RCPT, RSET, NOOP
+                self.reply("250 ok")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Bursty-load test for the post-submit job pipeline")
+    parser.add_argument("--backend", choices=["csv", "sqlite"], default="csv")
+    parser.add_argument("--bursts", default="1,10,50,200", help="comma-separated burst sizes")
+    parser.add_argument("--workers", type=int, default=2, help="job worker threads")
+    parser.add_argument("--attachment-every", type=int, default=5,
+                        help="every Nth submission carries an attachment")
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="supportdesk-jobs-")
+    upload_dir = os.path.join(tmp, "uploads")
+    store = open_store(args.backend, os.path.join(tmp, "submissions.csv"), os.path.join(tmp, "tickets.db"))
+    writer = TicketWriter(store)
+    sink = SmtpSink()
+    threading.Thread(target=sink.serve_forever, daemon=True).start()
+    queue = JobQueue(os.path.join(tmp, "jobs.db"))
+    handlers = make_handlers(store, upload_dir, "127.0.0.1", sink.server_address[1], "bench@localhost")
+    workers = JobWorkers(queue, handlers, workers=args.workers, poll=0.05).start()
+    png = b"\x89PNG\r\n\x1a\n" + random.randbytes(200_000)
+
+    sent = 0
+    print(f"backend={args.backend} workers={args.workers} data: {tmp}")
+    for burst in (int(b) for b in args.bursts.split(",")):
+        latencies: List[float] = []
+        lock = threading.Lock()
+
+        def submit(n: int) -> None:
+            t0 = time.perf_counter()
+            ref = ""
+            if n % args.attachment_every == 0:
+                ref = store_upload(io.BytesIO(png + str(n).encode()), f"shot-{n}.png", upload_dir)
+            row = ["2024-01-01T00:00:00Z", f"User {n}", f"user{n}@example.com", "Question", "Normal",
+                   "", f"burst ticket {n}", "Hello", ref, "127.0.0.1", "bench"]
+            writer.write(row)
+            enqueue_post_submit(queue, dict(zip(CSV_HEADERS, row)), consent=True)
+            with lock:
+                latencies.append((time.perf_counter() - t0) * 1000)
+
+        start = time.perf_counter()
+        pool = [threading.Thread(target=submit, args=(sent + i,)) for i in range(burst)]
+        for t in pool:
+            t.start()
+        for t in pool:
+            t.join()
+        submitted = time.perf_counter() - start
+        sent += burst
+
+        max_depth = 0
+        while True:
+            m = queue.metrics()
+            depth = m["queued"] + m["running"]
+            max_depth = max(max_depth, depth)
+            if depth == 0:
+                break
+            time.sleep(0.01)
+        drained = time.perf_counter() - start
+        latencies.sort()
+        print(f"burst={burst:4d}  submit p50={statistics.median(latencies):6.1f} ms "
+              f"p95={percentile(latencies, 95):6.1f} ms max={latencies[-1]:6.1f} ms  "
+              f"all stored in {submitted * 1000:7.1f} ms  queue drained in {drained * 1000:7.1f} ms "
+              f"(depth seen {max_depth})")
+
+    workers.close()
+    writer.close()
+    sink.shutdown()
+    m = queue.metrics()
+    print(f"emails received={sink.received}/{sent} jobs done={m['done']} failed={m['failed']} "
+          f"worker stats={workers.stats()}")
+    return 0 if sink.received == sent and not m["failed"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
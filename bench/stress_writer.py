@@ -0,0 +1,124 @@
+# Stress test for the batched ticket writer.
+#
+# Drives concurrent submissions from many threads (and optionally several
+# processes, standing in for Streamlit replicas sharing one data dir), then
+# re-reads the store and checks that every ticket arrived exactly once and
+# intact. Prints throughput and the number of write batches.
+#
+#   python bench/stress_writer.py                      # CSV, 32 threads x 25
+#   python bench/stress_writer.py --backend sqlite --processes 4
+
+import argparse
+import hashlib
+import multiprocessing as mp
+import os
+import sys
+import tempfile
+import threading
+import time
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage import CSV_HEADERS, iter_store_rows, open_store  # noqa: E402
+from ticket_writer import TicketWriter  # noqa: E402
+
+
+def make_row(proc: int, thread: int, seq: int) -> List[str]:
+    ref = f"p{proc}-t{thread}-n{seq}"
+    # Multi-line, quoted, non-ASCII body so torn or interleaved rows break parsing
+    message = f'Line one for {ref}\nline "two" — ünïcode\n' + "x" * (seq % 50)
+    digest = hashlib.sha1(message.encode("utf-8")).hexdigest()
+    return [
+        "2024-01-01T00:00:00Z", f"User {ref}", f"{ref}@example.com", "Bug report", "High",
+        ref, digest, message, "", "127.0.0.1", "stress",
+    ]
+
+
+def worker_process(backend: str, csv_path: str, db_path: str, proc: int,
+                   threads: int, per_thread: int, out: "mp.Queue") -> None:
+    writer = TicketWriter(open_store(backend, csv_path, db_path))
+
+    def submit_many(t: int) -> None:
+        for n in range(per_thread):
+            writer.write(make_row(proc, t, n))
+
+    start = time.perf_counter()
+    pool = [threading.Thread(target=submit_many, args=(t,)) for t in range(threads)]
+    for th in pool:
+        th.start()
+    for th in pool:
+        th.join()
+    elapsed = time.perf_counter() - start
+    stats = writer.stats()
+    writer.close()
+    out.put((proc, elapsed, stats))
+
+
+def read_back(backend: str, csv_path: str, db_path: str) -> List[dict]:
+    if backend == "csv":
+        # Archived segments (if a compaction ran) followed by the live CSV
+        return [dict(zip(CSV_HEADERS, row)) for _, row in iter_store_rows(csv_path)]
+    df = open_store(backend, csv_path, db_path).load()
+    return df.astype(str).to_dict("records")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Stress test for the batched ticket writer")
+    parser.add_argument("--backend", choices=["csv", "sqlite"], default="csv")
+    parser.add_argument("--processes", type=int, default=1)
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--per-thread", type=int, default=25)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="supportdesk-stress-")
+    csv_path = os.path.join(tmp, "submissions.csv")
+    db_path = os.path.join(tmp, "tickets.db")
+    open_store(args.backend, csv_path, db_path)  # create file / schema up front
+
+    out: "mp.Queue" = mp.Queue()
+    start = time.perf_counter()
+    procs = [
+        mp.Process(target=worker_process,
+                   args=(args.backend, csv_path, db_path, p, args.threads, args.per_thread, out))
+        for p in range(args.processes)
+    ]
+    for p in procs:
+        p.start()
+    results = [out.get() for _ in procs]
+    for p in procs:
+        p.join()
+    wall = time.perf_counter() - start
+
+    expected = {
+        f"p{p}-t{t}-n{n}"
+        for p in range(args.processes) for t in range(args.threads) for n in range(args.per_thread)
+    }
+    rows = read_back(args.backend, csv_path, db_path)
+    seen, corrupt = set(), 0
+    for rec in rows:
+        ref = rec["order_ref"]
+        ok = (
+            ref in expected
+            and rec["email"] == f"{ref}@example.com"
+            and hashlib.sha1(rec["message"].encode("utf-8")).hexdigest() == rec["subject"]
+            and set(rec) >= set(CSV_HEADERS)
+        )
+        corrupt += not ok
+        seen.add(ref)
+    missing = len(expected - seen)
+    duplicates = len(rows) - len(seen)
+
+    batches = sum(stats["batches"] for _, _, stats in results)
+    print(f"backend={args.backend} processes={args.processes} threads={args.threads} "
+          f"per_thread={args.per_thread}")
+    print(f"submitted={len(expected)} stored={len(rows)} missing={missing} "
+          f"duplicates={duplicates} corrupt={corrupt}")
+    print(f"wall={wall:.3f}s throughput={len(expected) / wall:,.0f} tickets/s "
+          f"batches={batches} avg_batch={len(expected) / max(batches, 1):.1f}")
+    print(f"data: {tmp}")
+    return 0 if not (missing or duplicates or corrupt) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,186 @@
+# Benchmark suite for the ticket store.
+#
+# For each size, generates a synthetic submissions.csv (a year of tickets,
+# ~10% with an attachment drawn from a pool of blobs in uploads/) in a temp
+# dir and reports the latencies behind the staff tab and the submit form:
+#
+#   generate   writing the synthetic CSV (setup, for reference)
+#   compact    archiving months older than ARCHIVE_AFTER_MONTHS (CSV, needs pyarrow)
+#   import     migrate_csv into SQLite (sqlite backend)
+#   load       first full load() of a freshly opened store, then a warm reload
+#   tail       reload after one appended ticket (incremental parse for CSV)
+#   filter     default 90-day window x each category, median
+#   search     90-day window x a few search terms, median
+#   page       first page, newest first, of the 90-day window
+#   export     the filtered CSV download for the 90-day window
+#   append     TicketWriter.write() latency for single submissions (p50 / p95)
+#   upload     store_upload() of a 1 MB and a 10 MB attachment
+#
+#   python bench/suite.py                          # 10k, 100k, 1M rows, CSV
+#   python bench/suite.py --sizes 10000 --backend sqlite --json results.jsonl
+#
+# --json appends one record per size, for comparing runs over time.
+
+import argparse
+import csv
+import io
+import json
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta, timezone
+from typing import Callable, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from attachments import store_upload  # noqa: E402
+from exports import export_tickets  # noqa: E402
+from perf import percentile  # noqa: E402
+from storage import CSV_HEADERS, CsvStore, SqliteStore, migrate_csv  # noqa: E402
+from ticket_writer import TicketWriter  # noqa: E402
+
+CATEGORIES = ["Question", "Bug report", "Feature request", "Other"]
+PRIORITIES = ["Normal", "Normal", "Normal", "High", "Urgent"]
+WORDS = ("printer invoice refund login password shipping delay broken screen update "
+         "account billing crash error timeout order missing package charge email "
+         "reset install license upgrade slow network sync export report").split()
+SEARCHES = ["printer", "refund shipping", "pass", "crash timeout error"]
+ATTACHMENT_POOL = 50
+WINDOW_DAYS = 90
+APPENDS = 200
+
+
+def timed(fn: Callable, *args, **kwargs):
+    t0 = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return (time.perf_counter() - t0) * 1000, result
+
+
+def make_attachments(upload_dir: str, rng: random.Random) -> List[str]:
+    refs = []
+    for i in range(ATTACHMENT_POOL):
+        body = io.BytesIO(rng.randbytes(rng.randint(2_000, 200_000)))
+        refs.append(store_upload(body, f"screenshot-{i}.png", upload_dir))
+    return refs
+
+
+def generate(path: str, rows: int, refs: List[str], rng: random.Random) -> None:
+    end = datetime.now(timezone.utc).replace(microsecond=0)
+    start = end - timedelta(days=365)
+    span = int((end - start).total_seconds())
+    # Sorted timestamps, like a real append-only log
+    offsets = sorted(rng.randrange(span) for _ in range(rows))
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(CSV_HEADERS)
+        batch = []
+        for n, off in enumerate(offsets):
+            ts = (start + timedelta(seconds=off)).strftime("%Y-%m-%dT%H:%M:%SZ")
+            user = rng.randrange(rows // 5 + 1)
+            words = rng.choices(WORDS, k=rng.randint(8, 60))
+            batch.append([
+                ts, f"User {user}", f"user{user}@example.com",
+                rng.choice(CATEGORIES), rng.choice(PRIORITIES),
+                f"ORD-{n:07d}" if rng.random() < 0.3 else "",
+                " ".join(words[:6]).capitalize(),
+                " ".join(words) + ("\nSecond line, with \"quotes\"." if rng.random() < 0.2 else ""),
+                rng.choice(refs) if rng.random() < 0.1 else "",
+                "10.0.0.1", "bench",
+            ])
+            if len(batch) >= 10_000:
+                writer.writerows(batch)
+                batch = []
+        writer.writerows(batch)
+
+
+def bench_size(rows: int, backend: str, seed: int) -> Dict[str, object]:
+    rng = random.Random(seed)
+    tmp = tempfile.mkdtemp(prefix=f"supportdesk-bench-{rows}-")
+    csv_path = os.path.join(tmp, "submissions.csv")
+    db_path = os.path.join(tmp, "tickets.db")
+    upload_dir = os.path.join(tmp, "uploads")
+    out: Dict[str, object] = {"rows": rows, "backend": backend}
+    try:
+        refs = make_attachments(upload_dir, rng)
+        out["generate_ms"], _ = timed(generate, csv_path, rows, refs, rng)
+        out["csv_mb"] = round(os.path.getsize(csv_path) / 1e6, 1)
+
+        if backend == "csv":
+            store = CsvStore(csv_path)
+            if store.archive.enabled:
+                out["compact_ms"], out["archived"] = timed(store.compact)
+            open_fresh = lambda: CsvStore(csv_path)  # noqa: E731
+        else:
+            out["import_ms"], _ = timed(migrate_csv, csv_path, db_path)
+            open_fresh = lambda: SqliteStore(db_path)  # noqa: E731
+
+        store = open_fresh()
+        out["load_ms"], df = timed(store.load)
+        out["reload_ms"], _ = timed(store.load)
+
+        writer = TicketWriter(store)
+        writer.write(["2025-01-01T00:00:00Z", "Tail", "tail@example.com", "Other", "Normal",
+                      "", "tail", "tail", "", "", "bench"])
+        out["tail_ms"], _ = timed(store.load)
+
+        _, hi = store.date_bounds()
+        window = dict(date_from=hi - timedelta(days=WINDOW_DAYS), date_to=hi)
+        out["window_rows"] = int(store.page(**window, limit=1)[1])
+        out["filter_ms"] = statistics.median(
+            timed(store.query, **window, category=c)[0] for c in CATEGORIES)
+        out["search_ms"] = statistics.median(
+            timed(store.query, **window, search=s)[0] for s in SEARCHES)
+        out["page_ms"], _ = timed(store.page, **window, sort="newest", offset=0, limit=50)
+        out["export_ms"], exported = timed(lambda: export_tickets(store, **window).read())
+        out["export_mb"] = round(len(exported) / 1e6, 1)
+
+        latencies = []
+        for n in range(APPENDS):
+            row = [date.today().isoformat() + "T12:00:00Z", f"Bench {n}", f"bench{n}@example.com",
+                   rng.choice(CATEGORIES), "Normal", "", f"append {n}", "Appended by the suite", "",
+                   "", "bench"]
+            latencies.append(timed(writer.write, row)[0])
+        writer.close()
+        latencies.sort()
+        out["append_p50_ms"] = percentile(latencies, 50)
+        out["append_p95_ms"] = percentile(latencies, 95)
+
+        for mb in (1, 10):
+            body = io.BytesIO(rng.randbytes(mb * 1024 * 1024))
+            out[f"upload_{mb}mb_ms"], _ = timed(store_upload, body, f"bench-{mb}mb.log", upload_dir)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    return out
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="SupportDesk store benchmark suite")
+    parser.add_argument("--sizes", default="10000,100000,1000000",
+                        help="comma-separated row counts")
+    parser.add_argument("--backend", choices=["csv", "sqlite"], default="csv")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", help="append one JSON record per size to this file")
+    args = parser.parse_args()
+
+    for rows in (int(s) for s in args.sizes.split(",")):
+        result = bench_size(rows, args.backend, args.seed)
+        print(f"--- {rows:,} rows ({args.backend}, {result['csv_mb']} MB CSV, "
+              f"{result['window_rows']:,} in the {WINDOW_DAYS}-day window)")
+        for key, value in result.items():
+            if key.endswith("_ms"):
+                print(f"  {key[:-3]:<12} {value:10.1f} ms")
+        if "archived" in result:
+            print(f"  archived     {result['archived']:10,} rows")
+        print(f"  export size  {result['export_mb']:10.1f} MB")
+        if args.json:
+            with open(args.json, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"ts": datetime.now(timezone.utc).isoformat(), **result}) + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,45 @@
+# Download payloads for the staff tab.
+#
+# st.download_button accepts a callable for `data`; Streamlit only invokes it
+# when the button is clicked. These helpers build such callables so a rerun
+# of the Tickets tab never reads attachments or serializes the result set.
+# When they do run, the CSV export is fetched from the store and written into
+# an anonymous temp file EXPORT_CHUNK_ROWS at a time, so memory follows the
+# chunk size rather than the number of matching tickets.
+
+from __future__ import annotations
+
+import io
+import tempfile
+from typing import Callable, Iterator
+
+EXPORT_CHUNK_ROWS = 5000
+
+
+def iter_ticket_csv(store, sort: str = "newest", chunk_rows: int = EXPORT_CHUNK_ROWS,
+                    **filters) -> Iterator[bytes]:
+    """UTF-8 CSV (no ids) of the matching tickets, fetched from the store a chunk at a time."""
+    header = True
+    for chunk in store.iter_pages(**filters, sort=sort, chunk_rows=chunk_rows):
+        yield chunk.drop(columns="id").to_csv(index=False, header=header).encode("utf-8")
+        header = False
+
+
+def export_tickets(store, sort: str = "newest", **filters) -> io.RawIOBase:
+    """Every ticket matching `filters`, full text, in `sort` order, as a CSV file.
+
+    Written into an unnamed temp file, returned rewound for reading.
+    """
+    out = tempfile.TemporaryFile(buffering=0)
+    for chunk in iter_ticket_csv(store, sort, **filters):
+        out.write(chunk)
+    out.seek(0)
+    return out
+
+
+def file_reader(path: str) -> Callable[[], bytes]:
+    """Deferred reader for a file on disk; opened and read only on click."""
+    def read() -> bytes:
+        with open(path, "rb") as fh:
+            return fh.read()
+    return read
@@ -0,0 +1,308 @@
+# Persistent background jobs for SupportDesk.
+#
+# Work that does not have to finish before the submitter sees "Submitted"
+# (acknowledgement emails, attachment checks, rollup/index refreshes, archive
+# compaction; see pipeline.py) is queued in data/jobs.db and run by a small pool
+# of worker threads:
+#
+#   queue = JobQueue("data/jobs.db")
+#   queue.enqueue("ack_email", {"to": ...})
+#   JobWorkers(queue, {"ack_email": send_ack}, workers=2).start()
+#
+# Jobs are rows, so they survive restarts: a worker leases a job before running
+# it, and a job whose lease ran out (its process died mid-run) is picked up
+# again. Several server processes can share one queue file. A handler that
+# raises is retried with exponential backoff until max_attempts; raising
+# JobFailed fails the job at once. Delivery is at-least-once, so handlers
+# should be safe to run twice.
+
+import json
+import logging
+import random
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+log = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'queued',  -- queued | running | done | failed
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    run_after REAL NOT NULL,                -- epoch seconds; backoff pushes it out
+    lease_until REAL,                       -- running: reclaimable after this
+    last_error TEXT NOT NULL DEFAULT '',
+    created REAL NOT NULL,
+    finished REAL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_due ON jobs(status, run_after);
+"""
+
+MAX_ATTEMPTS = 6
+BACKOFF_BASE = 2.0      # seconds before the first retry; doubles per attempt
+BACKOFF_MAX = 600.0
+LEASE_SECONDS = 300.0   # a job running longer than this is presumed dead
+DONE_RETENTION = 86400.0  # finished jobs are kept this long for metrics
+HOUSEKEEP_SECONDS = 60.0
+
+
+class Job(NamedTuple):
+    id: int
+    kind: str
+    payload: dict
+    attempts: int       # including this run
+    max_attempts: int
+
+
+class JobFailed(Exception):
+    """Raised by a handler to fail a job without further retries."""
+
+
+def backoff(attempts: int) -> float:
+    """Delay before retry number `attempts` (1-based), with jitter."""
+    delay = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (attempts - 1))
+    return delay * random.uniform(0.5, 1.0)
+
+
+class JobQueue:
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._wake = threading.Event()  # set on enqueue so idle workers start at once
+        with self._conn() as conn:
+            conn.executescript(SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            # Survives a process crash; a power cut may lose the latest jobs but
+            # never the tickets themselves, and enqueueing stays fsync-free.
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _immediate(self) -> Iterator[sqlite3.Connection]:
+        """A write transaction, taking the write lock up front."""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _write(self, sql: str, params: Iterable = ()) -> None:
+        with self._immediate() as conn:
+            conn.execute(sql, tuple(params))
+
+    # --- producers ---
+    def enqueue(self, kind: str, payload: dict, max_attempts: int = MAX_ATTEMPTS,
+                delay: float = 0.0, coalesce: bool = False) -> None:
+        self.enqueue_many([(kind, payload)], max_attempts=max_attempts, delay=delay, coalesce=coalesce)
+
+    def enqueue_many(self, jobs: List[Tuple[str, dict]], max_attempts: int = MAX_ATTEMPTS,
+                     delay: float = 0.0, coalesce: bool = False) -> None:
+        """Queue several jobs in one transaction.
+
+        With `coalesce`, a job is skipped if one of the same kind is already
+        waiting (for idempotent "catch up" work such as refreshes).
+        """
+        if not jobs:
+            return
+        now = time.time()
+        with self._immediate() as conn:
+            for kind, payload in jobs:
+                conn.execute(
+                    "INSERT INTO jobs (kind, payload, max_attempts, run_after, created) "
+                    "SELECT ?, ?, ?, ?, ? WHERE NOT ? OR NOT EXISTS "
+                    "(SELECT 1 FROM jobs WHERE kind = ? AND status = 'queued')",
+                    (kind, json.dumps(payload), max_attempts, now + delay, now, coalesce, kind),
+                )
+        self._wake.set()
+
+    # --- workers ---
+    def claim(self) -> Optional[Job]:
+        """Lease the next due job, or None if nothing is due."""
+        now = time.time()
+        # SELECT then UPDATE in one write transaction (no UPDATE ... RETURNING:
+        # that needs SQLite 3.35, newer than e.g. Debian bullseye's)
+        with self._immediate() as conn:
+            row = conn.execute(
+                "SELECT id, kind, payload, attempts, max_attempts FROM jobs "
+                "WHERE status = 'queued' AND run_after <= ? ORDER BY run_after, id LIMIT 1", (now,)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE jobs SET status = 'running', attempts = attempts + 1, lease_until = ? "
+                         "WHERE id = ?", (now + LEASE_SECONDS, row[0]))
+        job_id, kind, payload, attempts, max_attempts = row
+        return Job(job_id, kind, json.loads(payload), attempts + 1, max_attempts)
+
+    def complete(self, job: Job) -> None:
+        self._write("UPDATE jobs SET status = 'done', lease_until = NULL, last_error = '', finished = ? "
+                    "WHERE id = ?", (time.time(), job.id))
+
+    def fail(self, job: Job, error: str, retry: bool = True) -> bool:
+        """Record a failed run; returns True if the job will be retried."""
+        now = time.time()
+        if retry and job.attempts < job.max_attempts:
+            self._write("UPDATE jobs SET status = 'queued', lease_until = NULL, last_error = ?, "
+                        "run_after = ? WHERE id = ?", (error, now + backoff(job.attempts), job.id))
+            return True
+        self._write("UPDATE jobs SET status = 'failed', lease_until = NULL, last_error = ?, finished = ? "
+                    "WHERE id = ?", (error, now, job.id))
+        return False
+
+    def wake(self) -> None:
+        self._wake.set()
+
+    def wait(self, timeout: float) -> None:
+        if self._wake.wait(timeout):
+            self._wake.clear()
+
+    def housekeep(self) -> int:
+        """Requeue jobs whose lease expired and drop old finished ones.
+
+        Returns how many were requeued; expired jobs out of attempts fail instead.
+        """
+        now = time.time()
+        with self._immediate() as conn:
+            requeued = conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = 'running' AND lease_until < ? "
+                "AND attempts < max_attempts", (now,)).fetchone()[0]
+            conn.execute(
+                "UPDATE jobs SET lease_until = NULL, last_error = 'lease expired (worker died?)', "
+                "status = CASE WHEN attempts < max_attempts THEN 'queued' ELSE 'failed' END, "
+                "finished = CASE WHEN attempts < max_attempts THEN NULL ELSE ? END "
+                "WHERE status = 'running' AND lease_until < ?", (now, now))
+            conn.execute("DELETE FROM jobs WHERE status = 'done' AND finished < ?", (now - DONE_RETENTION,))
+        if requeued:
+            self._wake.set()
+        return requeued
+
+    # --- metrics ---
+    def metrics(self) -> Dict[str, object]:
+        conn = self._conn()
+        counts = dict(conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+        depth = dict(conn.execute(
+            "SELECT kind, COUNT(*) FROM jobs WHERE status IN ('queued', 'running') GROUP BY kind"
+        ).fetchall())
+        # Only jobs already due: a scheduled one (such as the next compaction) is not late
+        oldest = conn.execute("SELECT MIN(created) FROM jobs WHERE status = 'queued' AND run_after <= ?",
+                              (time.time(),)).fetchone()[0]
+        return {
+            **{s: counts.get(s, 0) for s in ("queued", "running", "done", "failed")},
+            "oldest_queued_s": round(time.time() - oldest, 1) if oldest else 0.0,
+            "depth_by_kind": depth,
+        }
+
+    def failures(self, limit: int = 20) -> List[Dict[str, object]]:
+        """Most recent permanently failed jobs."""
+        rows = self._conn().execute(
+            "SELECT id, kind, attempts, last_error, finished FROM jobs WHERE status = 'failed' "
+            "ORDER BY finished DESC LIMIT ?", (int(limit),)
+        ).fetchall()
+        return [dict(zip(("id", "kind", "attempts", "error", "finished"), r)) for r in rows]
+
+
+class JobWorkers:
+    """A pool of threads running queued jobs through per-kind handlers."""
+
+    def __init__(self, queue: JobQueue, handlers: Dict[str, Callable[[dict], None]],
+                 workers: int = 2, poll: float = 1.0):
+        self.queue = queue
+        self.handlers = handlers
+        self.poll = poll  # idle re-check interval (jobs from other processes, retries coming due)
+        self._stop = threading.Event()
+        self._threads = [threading.Thread(target=self._run, name=f"job-worker-{i}", daemon=True)
+                         for i in range(workers)]
+        self._stats_lock = threading.Lock()
+        self._last_housekeep = time.monotonic()  # start() housekeeps first
+        self.processed = 0
+        self.retried = 0
+        self.failed = 0
+        self.busy = 0
+        self._ms: Dict[str, List[float]] = {}  # kind -> [total ms, runs]
+
+    def start(self) -> "JobWorkers":
+        self.queue.housekeep()  # pick up jobs a previous process left running
+        for t in self._threads:
+            t.start()
+        return self
+
+    def stats(self) -> Dict[str, object]:
+        with self._stats_lock:
+            return {
+                "workers": len(self._threads),
+                "busy": self.busy,
+                "processed": self.processed,
+                "retried": self.retried,
+                "failed": self.failed,
+                "mean_ms": {k: round(total / n, 1) for k, (total, n) in self._ms.items()},
+            }
+
+    def close(self, timeout: float = 30.0) -> None:
+        self._stop.set()
+        self.queue.wake()
+        for t in self._threads:
+            t.join(timeout)
+
+    # --- worker threads ---
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                job = self.queue.claim()
+                if job is None:
+                    self._maybe_housekeep()
+                    self.queue.wait(self.poll)
+                    continue
+                self._execute(job)
+            except Exception:  # queue unavailable (locked, disk full, ...): back off
+                log.exception("job worker error")
+                self._stop.wait(self.poll)
+
+    def _execute(self, job: Job) -> None:
+        handler = self.handlers.get(job.kind)
+        with self._stats_lock:
+            self.busy += 1
+        t0 = time.perf_counter()
+        outcome = "done"
+        try:
+            if handler is None:
+                raise JobFailed(f"no handler for job kind {job.kind!r}")
+            handler(job.payload)
+        except JobFailed as exc:
+            self.queue.fail(job, str(exc), retry=False)
+            outcome = "failed"
+        except Exception as exc:
+            retried = self.queue.fail(job, f"{type(exc).__name__}: {exc}")
+            outcome = "retried" if retried else "failed"
+            log.warning("job %s (%s) attempt %d failed: %s", job.id, job.kind, job.attempts, exc)
+        else:
+            self.queue.complete(job)
+        ms = (time.perf_counter() - t0) * 1000
+        with self._stats_lock:
+            self.busy -= 1
+            self.processed += outcome == "done"
+            self.retried += outcome == "retried"
+            self.failed += outcome == "failed"
+            total = self._ms.setdefault(job.kind, [0.0, 0])
+            total[0] += ms
+            total[1] += 1
+
+    def _maybe_housekeep(self) -> None:
+        with self._stats_lock:
+            if time.monotonic() - self._last_housekeep < HOUSEKEEP_SECONDS:
+                return
+            self._last_housekeep = time.monotonic()
+        self.queue.housekeep()
@@ -0,0 +1,155 @@
+# Opt-in per-rerun profiling for SupportDesk.
+#
+# Off by default. Set SUPPORTDESK_PROFILE=1 (environment or st.secrets) and
+# every script run records how long each named stage took:
+#
+#   run = profiler.start(session_id)
+#   with run.stage("append_row"):
+#       ...
+#   profiler.finish(run)
+#
+# Finished runs go to a bounded in-memory history (for the staff diagnostics
+# panel) and, one JSON object per line, to data/perf.jsonl:
+#
+#   {"ts": "...Z", "session": "...", "run": 7, "total_ms": 41.2,
+#    "stages": {"page": 12.9, "rollups": 3.1}, "info": {"backend": "csv"}}
+#
+# A run cut short by st.rerun() is finished by the next start() of the same
+# session. When profiling is off, stage() is a no-op context manager.
+
+import json
+import os
+import statistics
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional
+
+ENV_VAR = "SUPPORTDESK_PROFILE"
+HISTORY = 500                # finished runs kept in memory
+MAX_LOG_BYTES = 10 * 1024 * 1024  # perf.jsonl is rotated to perf.jsonl.1 beyond this
+
+
+def is_enabled(value) -> bool:
+    return str(value or "").strip().lower() in ("1", "true", "yes", "on")
+
+
+class Run:
+    """Stage timings for one script run of one session."""
+
+    def __init__(self, session: str, number: int, enabled: bool):
+        self.session = session
+        self.number = number
+        self.enabled = enabled
+        self.started = time.perf_counter()
+        self.stages: Dict[str, float] = {}  # name -> ms (summed if a stage repeats)
+        self.info: Dict[str, object] = {}
+        self.finished = False
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        if not self.enabled:
+            yield
+            return
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + (time.perf_counter() - t0) * 1000
+
+    def note(self, **info) -> None:
+        """Attach context (row counts, filters used, ...) to the logged record."""
+        if self.enabled:
+            self.info.update(info)
+
+
+class Profiler:
+    def __init__(self, log_path: Optional[str], enabled: bool = True, history: int = HISTORY):
+        self.log_path = log_path
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._history: "deque[dict]" = deque(maxlen=history)
+        self._open: Dict[str, Run] = {}  # session -> run not finished yet
+        self._runs = 0
+
+    def start(self, session: str) -> Run:
+        if not self.enabled:
+            return Run(session, 0, False)
+        previous = self._open.get(session)
+        if previous is not None:
+            previous.note(interrupted=True)  # st.rerun() or an exception ended it early
+            self.finish(previous)
+        with self._lock:
+            self._runs += 1
+            run = Run(session, self._runs, True)
+            self._open[session] = run
+        return run
+
+    def finish(self, run: Run) -> None:
+        if not run.enabled or run.finished:
+            return
+        run.finished = True
+        record = {
+            "ts": datetime.now(timezone.utc).isoformat(timespec="milliseconds").replace("+00:00", "Z"),
+            "session": run.session,
+            "run": run.number,
+            "total_ms": round((time.perf_counter() - run.started) * 1000, 3),
+            "stages": {k: round(v, 3) for k, v in run.stages.items()},
+            "info": run.info,
+        }
+        with self._lock:
+            if self._open.get(run.session) is run:
+                del self._open[run.session]
+            self._history.append(record)
+            if self.log_path:
+                self._write(record)
+
+    def _write(self, record: dict) -> None:
+        """Append one JSON line (lock held); rotate once the log gets large."""
+        try:
+            if os.path.getsize(self.log_path) > MAX_LOG_BYTES:
+                os.replace(self.log_path, self.log_path + ".1")
+        except FileNotFoundError:
+            pass
+        with open(self.log_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, default=str) + "\n")
+
+    # --- reads ---
+    def __len__(self) -> int:
+        return len(self._history)
+
+    def recent(self, n: int = 20) -> List[dict]:
+        """Most recent finished runs, newest first."""
+        with self._lock:
+            return list(self._history)[-n:][::-1]
+
+    def summary(self) -> List[dict]:
+        """Per-stage count / mean / p50 / p95 / max (ms) over the in-memory history."""
+        with self._lock:
+            records = list(self._history)
+        samples: Dict[str, List[float]] = {"total": [r["total_ms"] for r in records]}
+        for r in records:
+            for name, ms in r["stages"].items():
+                samples.setdefault(name, []).append(ms)
+        rows = []
+        for name, values in samples.items():
+            if not values:
+                continue
+            values = sorted(values)
+            rows.append({
+                "stage": name,
+                "count": len(values),
+                "mean_ms": round(statistics.fmean(values), 2),
+                "p50_ms": round(percentile(values, 50), 2),
+                "p95_ms": round(percentile(values, 95), 2),
+                "max_ms": round(values[-1], 2),
+            })
+        return sorted(rows, key=lambda r: -r["mean_ms"] * r["count"])
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted, non-empty list."""
+    rank = max(1, -(-len(sorted_values) * pct // 100))
+    return sorted_values[int(rank) - 1]
@@ -0,0 +1,121 @@
+# Post-submit work for SupportDesk, run by the job workers (jobs.py).
+#
+# The submit handler only streams the attachment into the blob store and
+# appends the ticket; everything else is queued and done in the background:
+#
+#   ack_email    acknowledgement to the submitter, only with email-update
+#                consent and only once SMTP_HOST is configured (port SMTP_PORT,
+#                default 25); without it no acknowledgements are queued. For
+#                local testing, `python -m aiosmtpd -n -l localhost:1025` with
+#                SMTP_HOST=localhost and SMTP_PORT=1025 prints what would be sent
+#   attachment   re-hash the stored blob and check it is the type its name
+#                claims; failures are flagged (see attachments.py)
+#   refresh      fold new tickets into the store's rollups and search index
+#                (coalesced: a burst of submissions queues one refresh)
+#   compact      move old tickets into the store's archive (CSV, see archive.py)
+#                by running `storage.py compact` in a child process, so pandas
+#                and the parsed CSV never stay in a server process; re-queues
+#                itself to run again after COMPACT_EVERY seconds
+
+import os
+import smtplib
+import subprocess
+import sys
+from email.message import EmailMessage
+from functools import partial
+from typing import Callable, Dict, List, Optional, Tuple
+
+from attachments import ref_digest, reject, resolve, validate
+from jobs import JobFailed, JobQueue
+from storage import TicketStore
+
+SMTP_TIMEOUT = 10.0
+COMPACT_EVERY = 3600.0  # seconds between compactions
+COMPACT_FIRST = 60.0    # after startup, so a fresh process is not slowed by it
+COMPACT_TIMEOUT = 1800.0
+STORAGE_CLI = os.path.join(os.path.dirname(os.path.abspath(__file__)), "storage.py")
+
+
+def post_submit_jobs(ticket: Dict[str, str], consent: bool, email: bool = True) -> List[Tuple[str, dict]]:
+    """Jobs to queue for a newly stored ticket (CSV_HEADERS keys); `email` is False without SMTP."""
+    jobs = []
+    if email and consent and ticket.get("email"):
+        jobs.append(("ack_email", {k: ticket.get(k, "") for k in (
+            "timestamp", "full_name", "email", "category", "priority", "order_ref", "subject")}))
+    if ticket.get("attachment_file"):
+        jobs.append(("attachment", {"ref": ticket["attachment_file"]}))
+    return jobs
+
+
+def enqueue_post_submit(queue: JobQueue, ticket: Dict[str, str], consent: bool, email: bool = True) -> None:
+    queue.enqueue_many(post_submit_jobs(ticket, consent, email))
+    queue.enqueue("refresh", {}, coalesce=True)
+
+
+def schedule_compaction(queue: JobQueue, delay: float = COMPACT_EVERY) -> None:
+    # Coalesced: every process schedules one at startup, but only one waits
+    queue.enqueue("compact", {}, delay=delay, coalesce=True)
+
+
+def ack_message(ticket: Dict[str, str], sender: str) -> EmailMessage:
+    msg = EmailMessage()
+    msg["From"] = sender
+    msg["To"] = ticket["email"]
+    msg["Subject"] = f"We received your request: {ticket['subject']}"
+    ref = f"Reference: {ticket['order_ref']}\n" if ticket.get("order_ref") else ""
+    msg.set_content(
+        f"Hi {ticket['full_name'] or 'there'},\n\n"
+        f"Thanks for contacting WESO Support. We received your {ticket['category'].lower()} "
+        f"({ticket['priority']} priority) on {ticket['timestamp']}:\n\n"
+        f"  {ticket['subject']}\n\n{ref}"
+        "We typically reply within 1–2 business days.\n\n"
+        "— WESO Support Desk\n"
+    )
+    return msg
+
+
+def send_ack(payload: dict, host: Optional[str], port: int, sender: str) -> None:
+    if not host:  # queued before SMTP_HOST was removed
+        raise JobFailed("no SMTP server configured (SMTP_HOST)")
+    msg = ack_message(payload, sender)
+    try:
+        with smtplib.SMTP(host, port, timeout=SMTP_TIMEOUT) as smtp:
+            smtp.send_message(msg)
+    except smtplib.SMTPRecipientsRefused as exc:
+        raise JobFailed(f"recipient refused: {payload['email']}") from exc
+    # anything else (server down, timeout, 4xx) is retried with backoff
+
+
+def check_attachment(payload: dict, upload_dir: str) -> None:
+    ref = payload["ref"]
+    path, name = resolve(upload_dir, ref)
+    try:
+        problem = validate(path, name, ref_digest(ref))
+    except FileNotFoundError as exc:
+        raise JobFailed(f"attachment missing: {ref}") from exc
+    if problem:
+        reject(path, name, problem)
+
+
+def compact_store(payload: dict, store: TicketStore, queue: Optional[JobQueue]) -> None:
+    if queue is not None:
+        schedule_compaction(queue)  # the next run, queued even if this one fails
+    archive = getattr(store, "archive", None)
+    if archive is None or not archive.enabled:
+        return  # no archive to compact into (SQLite, or no pyarrow)
+    proc = subprocess.run([sys.executable, STORAGE_CLI, "compact", "--csv", store.path],
+                          capture_output=True, text=True, timeout=COMPACT_TIMEOUT)
+    if proc.returncode != 0:
+        raise RuntimeError(f"storage.py compact exited with {proc.returncode}: {proc.stderr[-500:]}")
+
+
+def make_handlers(store: TicketStore, upload_dir: str, smtp_host: Optional[str] = None,
+                  smtp_port: int = 25, smtp_from: str = "support@localhost",
+                  queue: Optional[JobQueue] = None) -> Dict[str, Callable[[dict], None]]:
+    """Handlers for every post-submit job kind; `queue` lets compaction re-queue itself."""
+    return {
+        "ack_email": partial(send_ack, host=smtp_host, port=smtp_port, sender=smtp_from),
+        "attachment": partial(check_attachment, upload_dir=upload_dir),
+        "refresh": lambda payload: store.refresh(),
+        "compact": partial(compact_store, store=store, queue=queue),
+    }
@@ -0,0 +1,158 @@
+# Pre-aggregated ticket analytics.
+#
+# Every appended batch bumps two small SQLite tables, so the analytics panel
+# reads O(days x categories x priorities) rows instead of scanning tickets:
+#
+#   daily_counts      (day, category, priority) -> n
+#   submitter_counts  email -> n, last_seen
+#
+# The SQLite backend keeps them in tickets.db and updates them in the same
+# transaction as the insert; the CSV backend keeps them in data/rollups.db and
+# folds in newly appended rows before they are read. rollup_meta.rows records
+# how many tickets are folded in, which tells a store what is missing (and
+# when its rollups no longer match its data and need a rebuild).
+
+from __future__ import annotations
+
+import sqlite3
+import threading
+from collections import Counter
+from datetime import date
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+ROLLUP_SCHEMA = """
+CREATE TABLE IF NOT EXISTS daily_counts (
+    day TEXT NOT NULL,
+    category TEXT NOT NULL,
+    priority TEXT NOT NULL,
+    n INTEGER NOT NULL,
+    PRIMARY KEY (day, category, priority)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS submitter_counts (
+    email TEXT PRIMARY KEY,
+    n INTEGER NOT NULL,
+    last_seen TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS rollup_meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+) WITHOUT ROWID;
+"""
+
+# (timestamp, email, category, priority) for one ticket
+RollupRecord = Tuple[str, str, str, str]
+
+
+def connect(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=FULL")  # a committed ticket survives power loss
+    return conn
+
+
+class Rollups:
+    def __init__(self, path: str, headers: List[str]):
+        self.path = path
+        self._idx = {h: headers.index(h) for h in ("timestamp", "email", "category", "priority")}
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.executescript(ROLLUP_SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = connect(self.path)
+        return conn
+
+    # --- writes ---
+    def records(self, rows: Iterable[List[str]]) -> Iterable[RollupRecord]:
+        i = self._idx
+        for row in rows:
+            yield (str(row[i["timestamp"]]), str(row[i["email"]]).strip(),
+                   str(row[i["category"]]).strip(), str(row[i["priority"]]).strip())
+
+    def apply(self, rows: List[List[str]], conn: Optional[sqlite3.Connection] = None) -> None:
+        """Fold raw ticket rows (CSV_HEADERS order) into the rollups.
+
+        Pass `conn` to join the caller's open transaction; otherwise this
+        commits on its own connection.
+        """
+        self.apply_records(self.records(rows), conn)
+
+    def apply_records(self, records: Iterable[RollupRecord], conn: Optional[sqlite3.Connection] = None) -> None:
+        if conn is None:
+            with self._conn() as own:
+                self._apply(own, records)
+        else:
+            self._apply(conn, records)
+
+    def _apply(self, conn: sqlite3.Connection, records: Iterable[RollupRecord]) -> None:
+        daily: Counter = Counter()
+        submitters: Counter = Counter()
+        last_seen: Dict[str, str] = {}
+        total = 0
+        for ts, email, category, priority in records:
+            total += 1
+            daily[(ts[:10], category, priority)] += 1
+            if email:
+                submitters[email] += 1
+                last_seen[email] = max(ts, last_seen.get(email, ""))
+        if not total:
+            return
+        conn.executemany(
+            "INSERT INTO daily_counts (day, category, priority, n) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (day, category, priority) DO UPDATE SET n = n + excluded.n",
+            [(d, c, p, n) for (d, c, p), n in daily.items()],
+        )
+        conn.executemany(
+            "INSERT INTO submitter_counts (email, n, last_seen) VALUES (?, ?, ?) "
+            "ON CONFLICT (email) DO UPDATE SET n = n + excluded.n, "
+            "last_seen = max(last_seen, excluded.last_seen)",
+            [(e, n, last_seen[e]) for e, n in submitters.items()],
+        )
+        conn.execute(
+            "INSERT INTO rollup_meta (key, value) VALUES ('rows', ?) "
+            "ON CONFLICT (key) DO UPDATE SET value = value + excluded.value",
+            (total,),
+        )
+
+    def rebuild(self, records: Iterable[RollupRecord], conn: Optional[sqlite3.Connection] = None) -> None:
+        """Replace the rollups with aggregates of `records` (startup repair)."""
+        own = conn is None
+        conn = self._conn() if own else conn
+        with conn:
+            conn.execute("DELETE FROM daily_counts")
+            conn.execute("DELETE FROM submitter_counts")
+            conn.execute("DELETE FROM rollup_meta")
+            self._apply(conn, records)
+
+    # --- reads ---
+    def rows(self) -> int:
+        row = self._conn().execute("SELECT value FROM rollup_meta WHERE key = 'rows'").fetchone()
+        return row[0] if row else 0
+
+    def daily(self, date_from: Optional[date] = None, date_to: Optional[date] = None) -> pd.DataFrame:
+        """Columns day (datetime), category, priority, n for the inclusive day range."""
+        import pandas as pd
+        where, params = [], []
+        if date_from is not None:
+            where.append("day >= ?"); params.append(date_from.isoformat())
+        if date_to is not None:
+            where.append("day <= ?"); params.append(date_to.isoformat())
+        sql = "SELECT day, category, priority, n FROM daily_counts"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        df = pd.read_sql_query(sql + " ORDER BY day", self._conn(), params=params)
+        df["day"] = pd.to_datetime(df["day"], errors="coerce")
+        return df.dropna(subset=["day"])
+
+    def top_submitters(self, limit: int = 10) -> pd.DataFrame:
+        import pandas as pd
+        return pd.read_sql_query(
+            "SELECT email, n AS tickets, last_seen FROM submitter_counts "
+            "ORDER BY n DESC, last_seen DESC LIMIT ?",
+            self._conn(), params=[int(limit)],
+        )
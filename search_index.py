@@ -0,0 +1,91 @@
+# In-process inverted index for the staff ticket search box (CSV backend).
+#
+# The SQLite backend uses FTS5 instead (see storage.py); this module gives the
+# CSV backend the same behaviour: every query term is a token prefix, all
+# terms must match, and results are ranked by a tf-idf score. Documents are
+# added incrementally, so new tickets are searchable without a rebuild.
+
+import math
+import re
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Dict, Iterable, List, Tuple
+
+SEARCH_FIELDS = ["full_name", "email", "order_ref", "subject", "message"]
+
+# Same token rules as SQLite's unicode61 tokenizer: runs of letters/digits
+_TOKEN_RE = re.compile(r"[^\W_]+")
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall(str(text).lower())
+
+
+class TokenIndex:
+    """Token -> {doc_id: term frequency}, with a sorted vocabulary for prefix lookups."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._postings: Dict[str, Dict[int, int]] = defaultdict(dict)
+        self._vocab: List[str] = []
+        self._new_tokens: List[str] = []  # not yet merged into _vocab (see _expand)
+        self.doc_count = 0
+
+    def add(self, doc_id: int, texts: Iterable[str]) -> None:
+        counts: Dict[str, int] = defaultdict(int)
+        for text in texts:
+            for tok in tokenize(text):
+                counts[tok] += 1
+        with self._lock:
+            for tok, tf in counts.items():
+                posting = self._postings[tok]
+                if not posting:
+                    self._new_tokens.append(tok)
+                posting[doc_id] = tf
+            self.doc_count += 1
+
+    def _expand(self, prefix: str) -> List[str]:
+        if self._new_tokens:
+            # Sorting once per search beats insort per new token, which made
+            # indexing quadratic (emails and refs add tokens on most tickets).
+            # Timsort merges the sorted vocabulary and the new run cheaply.
+            self._vocab.extend(self._new_tokens)
+            self._vocab.sort()
+            self._new_tokens = []
+        i = bisect_left(self._vocab, prefix)
+        out = []
+        while i < len(self._vocab) and self._vocab[i].startswith(prefix):
+            out.append(self._vocab[i])
+            i += 1
+        return out
+
+    def search(self, query: str) -> List[Tuple[int, float]]:
+        """(doc_id, score) pairs matching every query term, best first."""
+        terms = tokenize(query)
+        if not terms:
+            return []
+        with self._lock:
+            n = max(self.doc_count, 1)
+            scores: Dict[int, float] = {}
+            for pos, term in enumerate(terms):
+                term_scores: Dict[int, float] = defaultdict(float)
+                for tok in self._expand(term):
+                    posting = self._postings[tok]
+                    idf = math.log(1 + n / len(posting))
+                    # Exact token hits outrank prefix hits
+                    weight = idf if tok == term else idf * 0.5
+                    for doc_id, tf in posting.items():
+                        term_scores[doc_id] += (1 + math.log(tf)) * weight
+                if pos == 0:
+                    scores = dict(term_scores)
+                else:
+                    scores = {d: s + term_scores[d] for d, s in scores.items() if d in term_scores}
+                if not scores:
+                    return []
+        return sorted(scores.items(), key=lambda kv: (-kv[1], -kv[0]))
+
+
+def fts_query(query: str) -> str:
+    """Translate free text into an FTS5 MATCH expression: every term as a quoted prefix."""
+    return " ".join(f'"{tok}"*' for tok in tokenize(query))
@@ -0,0 +1,831 @@
+# Storage backends for SupportDesk tickets.
+#
+# support.py talks to a TicketStore; which one is used is picked by the
+# STORAGE_BACKEND setting ("csv" by default, or "sqlite").
+#
+#   CsvStore     the original append-only data/submissions.csv, read through
+#                the incremental TicketCache and filtered in pandas. Rows older
+#                than ARCHIVE_AFTER_MONTHS are compacted into monthly Parquet
+#                segments (archive.py) that date filters can skip entirely.
+#   SqliteStore  data/tickets.db in WAL mode with indexes on timestamp,
+#                category, priority and email; filters run as SQL.
+#
+# Both support full-text search over SEARCH_FIELDS with prefix matching and
+# relevance ranking: FTS5 for SQLite, search_index.TokenIndex for CSV.
+#
+# Both keep incremental analytics rollups (see rollups.py) next to the data.
+# SQLite updates them in the insert transaction; CSV folds new rows in when the
+# rollups are next read (or when the post-submit refresh job runs, see jobs.py),
+# so an append costs one fsync, not two.
+#
+# Migrate an existing CSV (and its archive) into SQLite (refuses a non-empty DB):
+#   python storage.py migrate --csv data/submissions.csv --db data/tickets.db
+# Compact the CSV now instead of waiting for the hourly compact job (pipeline.py):
+#   python storage.py compact --csv data/submissions.csv [--before 2024-01-01]
+#
+# pandas is only imported by read paths (the staff tab), never by append_many().
+
+from __future__ import annotations
+
+import argparse
+import csv
+import io
+import os
+import sqlite3
+import sys
+import threading
+from contextlib import contextmanager
+from datetime import date, timedelta
+from itertools import chain
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+try:  # POSIX advisory locks; other platforms rely on the single writer thread
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+from archive import Archive
+from rollups import Rollups
+from search_index import SEARCH_FIELDS, TokenIndex, fts_query, tokenize
+from ticket_cache import TicketCache, normalize
+
+CSV_HEADERS = [
+    "timestamp", "full_name", "email", "category", "priority",
+    "order_ref", "subject", "message", "attachment_file",
+    "client_ip", "user_agent",
+]
+
+DateBounds = Tuple[Optional[date], Optional[date]]
+
+# Sort orders for TicketStore.page(); "relevance" only applies to searches
+SORTS = ["newest", "oldest", "priority", "relevance"]
+PRIORITY_RANK = {"Urgent": 0, "High": 1, "Normal": 2}
+PREVIEW_CHARS = 160
+
+
+def truncate(values: pd.Series, limit: int) -> pd.Series:
+    """Shorten long text for table display, marking cut values with an ellipsis."""
+    values = values.astype(str)
+    long = values.str.len() > limit
+    if not long.any():
+        return values
+    return values.where(~long, values.str.slice(0, limit) + "…")
+
+
+def _day_bounds(date_from: Optional[date], date_to: Optional[date]) -> Tuple[Optional[str], Optional[str]]:
+    """ISO strings for an inclusive [date_from, date_to] day range: ts >= lo and ts < hi."""
+    lo = date_from.isoformat() if date_from else None
+    hi = (date_to + timedelta(days=1)).isoformat() if date_to else None
+    return lo, hi
+
+
+@contextmanager
+def _locked(f, exclusive: bool = True, blocking: bool = True):
+    """Advisory lock on an open file, shared across processes (no-op without fcntl).
+
+    Yields whether the lock was taken, which is always True when blocking.
+    """
+    if fcntl is None:
+        yield True
+        return
+    try:
+        fcntl.flock(f, (fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH) | (0 if blocking else fcntl.LOCK_NB))
+    except BlockingIOError:
+        yield False
+        return
+    try:
+        yield True
+    finally:
+        fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _copy_bytes(src, dst, size: Optional[int], chunk: int = 1 << 20) -> None:
+    """Copy `size` bytes (None = the rest) from src's current position to dst."""
+    while size is None or size > 0:
+        buf = src.read(chunk if size is None else min(chunk, size))
+        if not buf:
+            break
+        dst.write(buf)
+        if size is not None:
+            size -= len(buf)
+
+
+def _record_end(f, records: int) -> int:
+    """Byte offset just past the first `records` CSV records of binary file `f`."""
+    pos = 0
+
+    def lines():
+        nonlocal pos
+        for line in f:
+            pos += len(line)
+            yield line.decode("utf-8")
+
+    reader = csv.reader(lines())  # pulls lines only as each record needs them
+    for _ in range(records):
+        if next(reader, None) is None:
+            break
+    return pos
+
+
+class TicketStore:
+    """Interface every ticket backend implements."""
+
+    name = "base"
+    rollups: Rollups  # daily/submitter aggregates, current as of the read
+
+    def append(self, row: List[str]) -> None:
+        self.append_many([row])
+
+    def append_many(self, rows: List[List[str]]) -> None:
+        raise NotImplementedError
+
+    def load(self) -> pd.DataFrame:
+        """All tickets, normalized for display."""
+        return self.query()
+
+    def query(self, date_from: Optional[date] = None, date_to: Optional[date] = None,
+              category: Optional[str] = None, priority: Optional[str] = None,
+              search: Optional[str] = None) -> pd.DataFrame:
+        """Tickets in the inclusive date range matching category/priority (None = any).
+
+        With `search`, only tickets matching every search term (as a prefix) are
+        returned, best match first.
+        """
+        raise NotImplementedError
+
+    def page(self, date_from: Optional[date] = None, date_to: Optional[date] = None,
+             category: Optional[str] = None, priority: Optional[str] = None,
+             search: Optional[str] = None, sort: str = "newest", offset: int = 0,
+             limit: Optional[int] = None,
+             preview_chars: Optional[int] = PREVIEW_CHARS) -> Tuple[pd.DataFrame, int]:
+        """One sorted page of matching tickets and the total number of matches.
+
+        Only the requested rows are materialized. The page has an `id` column
+        (see get()) and, unless preview_chars is None, a truncated message.
+        """
+        raise NotImplementedError
+
+    def iter_pages(self, date_from: Optional[date] = None, date_to: Optional[date] = None,
+                   category: Optional[str] = None, priority: Optional[str] = None,
+                   search: Optional[str] = None, sort: str = "newest",
+                   chunk_rows: int = 5000) -> Iterator[pd.DataFrame]:
+        """Every matching ticket in page() order with full text, `chunk_rows` at a time.
+
+        For exports: memory follows the chunk size, not the number of matches.
+        At least one chunk (empty if nothing matches) is yielded.
+        """
+        raise NotImplementedError
+
+    def get(self, ticket_id: int) -> Optional[Dict[str, object]]:
+        """Every field of one ticket, or None if the id is unknown."""
+        raise NotImplementedError
+
+    def count(self) -> int:
+        raise NotImplementedError
+
+    def date_bounds(self) -> DateBounds:
+        raise NotImplementedError
+
+    def distinct(self, column: str) -> List[str]:
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, int]:
+        return {"rows": self.count()}
+
+    def refresh(self) -> None:
+        """Bring derived data (rollups, search index) up to date, off the request path.
+
+        A no-op for backends that maintain them as part of every append.
+        """
+
+    def compact(self, cutoff: Optional[date] = None) -> int:
+        """Move tickets older than `cutoff` to cheaper storage; returns how many.
+
+        A no-op for backends without an archive.
+        """
+        return 0
+
+
+def _rollup_records(df: pd.DataFrame) -> Iterable[Tuple[str, str, str, str]]:
+    """Rollup records (see rollups.py) for normalized ticket rows."""
+    stamps = df["timestamp"].dt.strftime("%Y-%m-%dT%H:%M:%SZ").fillna("")
+    return zip(stamps, df["email"].str.strip(), df["category"], df["priority"])
+
+
+def _page_frame(df: pd.DataFrame, preview_chars: Optional[int]) -> pd.DataFrame:
+    """Copy of a page with the ticket id as a column and (optionally) short messages."""
+    page = df.copy()
+    if "id" not in page.columns:
+        page.insert(0, "id", page.index)
+    if preview_chars is not None and "message" in page.columns:
+        page["message"] = truncate(page["message"], preview_chars)
+    return page.reset_index(drop=True)
+
+
+# --- CSV ---
+ARCHIVE_AFTER_MONTHS = 3  # rows older than this many whole months go to the archive
+
+
+def _archive_cutoff(today: date, months: int) -> date:
+    """First day of the month `months` months before today's month."""
+    index = today.year * 12 + today.month - 1 - months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+class CsvStore(TicketStore):
+    """Append-only CSV for recent tickets plus a Parquet archive for older ones.
+
+    Ticket ids are global row numbers: archived rows keep theirs in their
+    segment, and live CSV rows are numbered from the archive's row count.
+    Appends take `<csv>.lock` (other processes too). Compactions serialize on
+    `<csv>.compact.lock` and take the append lock only for the moment they swap
+    in the trimmed CSV, so they never swallow or stall a concurrent append.
+    Rollup syncs take `<csv>.rollups.lock`, which compaction also holds while
+    rows move to the archive.
+    """
+
+    name = "csv"
+
+    def __init__(self, path: str, headers: List[str] = CSV_HEADERS,
+                 rollup_path: Optional[str] = None, archive_dir: Optional[str] = None,
+                 archive_after_months: int = ARCHIVE_AFTER_MONTHS):
+        self.path = path
+        self.headers = list(headers)
+        data_dir = os.path.dirname(path) or "."
+        os.makedirs(data_dir, exist_ok=True)
+        # Create CSV if missing
+        if not os.path.exists(path):
+            with open(path, "w", newline="", encoding="utf-8") as f:
+                csv.writer(f).writerow(self.headers)
+        self.lock_path = path + ".lock"
+        self.compact_lock_path = path + ".compact.lock"
+        self.rollup_lock_path = path + ".rollups.lock"
+        self.cache = TicketCache(path, self.headers)
+        self.archive = Archive(archive_dir or os.path.join(data_dir, "archive"), self.headers)
+        self.archive_after_months = archive_after_months
+        self._hot_state: Tuple[tuple, Optional[pd.DataFrame]] = ((), None)
+        self._index_lock = threading.Lock()
+        self._index = TokenIndex()
+        self._indexed_rows = 0
+        self._indexed_key: tuple = ()
+        self._last_query: Tuple[tuple, Optional[pd.DataFrame]] = ((), None)
+        self._rollups = Rollups(os.path.join(data_dir, "rollups.db") if rollup_path is None else rollup_path,
+                                self.headers)
+        # Recovery and rollup sync need pandas, so they wait for the first read
+        # and submit-only processes never run them (the compact job runs
+        # compaction in a child process, see pipeline.py).
+        self._ready = False
+        self._ready_lock = threading.Lock()
+
+    def _prepare(self) -> None:
+        with self._ready_lock:
+            if self._ready:
+                return
+            self._ready = True
+            # Recover a compaction interrupted mid-way, unless one is running
+            # right now (it finishes any pending trim itself)
+            with self._file_lock(self.compact_lock_path, blocking=False) as locked:
+                if locked:
+                    self._finish_trim()
+
+    @contextmanager
+    def _file_lock(self, path: Optional[str] = None, exclusive: bool = True, blocking: bool = True):
+        with open(path or self.lock_path, "a+b") as f, _locked(f, exclusive, blocking) as locked:
+            yield locked
+
+    @property
+    def rollups(self) -> Rollups:
+        # Readers get rollups that cover every stored ticket
+        if not self._ready:
+            self._prepare()
+        self._sync_rollups()
+        return self._rollups
+
+    def _sync_rollups(self) -> None:
+        """Fold rows appended since the last sync into the rollups.
+
+        Ids are global row numbers, so the rollups' row count is also the id of
+        the first row not yet folded in. Anything else (rollups ahead of the
+        data, or missing rows that were archived since) is repaired by a rebuild.
+        """
+        if self._rollups.rows() == self.count():
+            return
+        # One sync at a time, and no compaction moving rows meanwhile. Appends
+        # carry on: rows past the snapshot are folded in by the next sync.
+        with self._file_lock(self.rollup_lock_path):
+            self._fold_rollups(self._hot())
+
+    def _fold_rollups(self, hot: pd.DataFrame) -> None:
+        """Fold a snapshot of the live rows into the rollups (rollup lock held)."""
+        folded, archived = self._rollups.rows(), hot.index.start
+        if folded == archived + len(hot):
+            return
+        if archived <= folded < archived + len(hot):
+            self._rollups.apply_records(_rollup_records(hot.loc[folded:]))
+        else:
+            self._rollups.rebuild(chain(self.archive.records(), _rollup_records(hot)))
+
+    def refresh(self) -> None:
+        # Only worth it once a reader has loaded the store in this process;
+        # until then readers catch up on demand (and pandas stays unloaded).
+        if not self._ready:
+            return
+        self._sync_rollups()
+        self._search_index(self._hot())
+
+    def append_many(self, rows: List[List[str]]) -> None:
+        # Serialize first so the whole batch goes out in one write, then hold an
+        # exclusive lock (other processes / replicas) while appending + fsyncing.
+        # Rollups catch up later (see _sync_rollups).
+        buf = io.StringIO()
+        csv.writer(buf).writerows(rows)
+        data = buf.getvalue().encode("utf-8")
+        with self._file_lock(), open(self.path, "ab") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+
+    # --- compaction ---
+    def compact(self, cutoff: Optional[date] = None) -> int:
+        """Move live rows older than `cutoff` into the archive; returns rows archived.
+
+        Only the leading run of old (or undated) rows moves, so ids of the rows
+        left in the CSV do not change. Appends carry on while the segments are
+        written; see _finish_trim() for the only part that blocks them.
+        """
+        import pandas as pd
+        if not self.archive.enabled:
+            return 0
+        if not self._ready:
+            self._prepare()  # takes the compaction lock itself, so before we do
+        if cutoff is None:
+            cutoff = _archive_cutoff(date.today(), self.archive_after_months)
+        with self._file_lock(self.compact_lock_path):  # one compaction at a time
+            self._finish_trim()
+            self.archive.remove_unlisted()  # segments replaced by the previous run
+            # Appends only ever add rows after the prefix we archive, so the
+            # snapshot needs no append lock.
+            with self._file_lock(self.rollup_lock_path):
+                hot = self._hot()
+                self._fold_rollups(hot)  # fold rows in before they move to the archive
+                ts = hot["timestamp"]
+                old = ((ts < pd.Timestamp(cutoff, tz="UTC")) | ts.isna()).to_numpy()
+                n = int(old.argmin()) if not old.all() else len(old)
+                if n == 0:
+                    return 0
+                self.archive.append(hot.iloc[:n], {"inode": os.stat(self.path).st_ino, "rows": n})
+            self._finish_trim()
+        return n
+
+    def _finish_trim(self) -> None:
+        """Drop already archived rows from the front of the CSV (compaction lock held).
+
+        The surviving rows are copied as raw bytes while appends continue; the
+        append lock is held only to copy what was appended meanwhile and swap
+        the new file in.
+        """
+        pending = self.archive.manifest().get("pending_trim")
+        if not pending:
+            return
+        if os.stat(self.path).st_ino == pending["inode"]:
+            tmp = self.path + ".tmp"
+            with open(self.path, "rb") as src, open(tmp, "wb") as dst:
+                with self._file_lock(exclusive=False):
+                    copied = os.fstat(src.fileno()).st_size  # whole rows only
+                header_end = _record_end(src, 1)
+                cut = _record_end(src, pending["rows"]) + header_end
+                src.seek(0)
+                dst.write(src.read(header_end))
+                src.seek(cut)
+                _copy_bytes(src, dst, copied - cut)
+                dst.flush()
+                os.fsync(dst.fileno())
+                with self._file_lock():
+                    _copy_bytes(src, dst, None)  # rows appended during the copy
+                    dst.flush()
+                    os.fsync(dst.fileno())
+                    os.replace(tmp, self.path)
+        self.archive.clear_pending()
+
+    # --- reads ---
+    def _hot(self) -> pd.DataFrame:
+        """Live CSV rows, indexed by ticket id."""
+        import pandas as pd
+        if not self._ready:
+            self._prepare()
+        df = self.cache.load()
+        manifest = self.archive.manifest()
+        pending = manifest.get("pending_trim")
+        # Between archiving and trimming, the CSV's first rows are already archived
+        skip = pending["rows"] if pending and os.stat(self.path).st_ino == pending["inode"] else 0
+        offset = manifest["archived_rows"]
+        key = (self.cache.generation, len(df), offset, skip)
+        last_key, hot = self._hot_state
+        if last_key != key:
+            hot = df.iloc[skip:]
+            hot = hot.set_axis(pd.RangeIndex(offset, offset + len(hot)))
+            self._hot_state = (key, hot)
+        return hot
+
+    def _search_index(self, hot: pd.DataFrame) -> TokenIndex:
+        """Bring the live rows' token index up to date, indexing only new rows."""
+        with self._index_lock:
+            key = (self.cache.generation, hot.index.start if len(hot) else None)
+            if self._indexed_key != key or self._indexed_rows > len(hot):
+                self._index = TokenIndex()
+                self._indexed_rows = 0
+                self._indexed_key = key
+            if self._indexed_rows < len(hot):
+                new = hot.iloc[self._indexed_rows:]
+                fields = [c for c in SEARCH_FIELDS if c in new.columns]
+                for doc_id, *texts in new[fields].itertuples(name=None):
+                    self._index.add(doc_id, texts)
+                self._indexed_rows = len(hot)
+            return self._index
+
+    def load(self) -> pd.DataFrame:
+        return self.query()
+
+    def query(self, date_from=None, date_to=None, category=None, priority=None,
+              search=None) -> pd.DataFrame:
+        import pandas as pd
+        hot = self._hot()
+        keys = self.archive.keys_for(date_from, date_to)  # prune archive by date
+        # Paging / sorting reruns repeat the same filters; reuse the last result
+        # until the CSV or the archive changes.
+        key = (self.archive.version(), self._hot_state[0], tuple(keys),
+               date_from, date_to, category, priority, search)
+        last_key, last = self._last_query
+        if last_key == key:
+            return last
+        parts = [self.archive.load_segment(k) for k in keys]
+        if len(hot) or not parts:  # an empty frame would turn timestamp into object
+            parts.append(hot)
+        df = pd.concat(parts) if len(parts) > 1 else parts[0]
+        ranked = None
+        if search and tokenize(search):
+            hits = dict(self._search_index(hot).search(search))
+            for k in keys:
+                hits.update(self.archive.segment_index(k).search(search))
+            ranked = pd.Series(hits, dtype=float).sort_index(ascending=False)
+            ranked = ranked.sort_values(ascending=False, kind="stable")
+        result = self._filter(df, date_from, date_to, category, priority, ranked)
+        self._last_query = (key, result)
+        return result
+
+    def _filter(self, df, date_from, date_to, category, priority, ranked) -> pd.DataFrame:
+        import pandas as pd
+        if df.empty:
+            return df
+        mask = pd.Series(True, index=df.index)
+        if date_from is not None or date_to is not None:
+            days = df["timestamp"].dt.date
+            if date_from is not None:
+                mask &= days >= date_from
+            if date_to is not None:
+                mask &= days <= date_to
+        if category is not None:
+            mask &= df["category"] == category
+        if priority is not None:
+            mask &= df["priority"] == priority
+        if ranked is not None:
+            ranked = ranked[mask.reindex(ranked.index, fill_value=False).to_numpy()]
+            return df.loc[ranked.index]
+        return df if mask.all() else df[mask]
+
+    def _order(self, df: pd.DataFrame, sort: str, search: Optional[str]) -> pd.Index:
+        """Ids of `df` in display order."""
+        import pandas as pd
+        if sort == "relevance" and search and tokenize(search):
+            return df.index  # query() already returns best match first
+        # Sort keys only; ties go to the most recently submitted ticket
+        ts = df["timestamp"].iloc[::-1]
+        if sort == "oldest":
+            return df["timestamp"].sort_values(kind="stable", na_position="last").index
+        if sort == "priority":
+            rank = df["priority"].map(PRIORITY_RANK).fillna(len(PRIORITY_RANK)).iloc[::-1]
+            keys = pd.DataFrame({"rank": rank, "ts": ts})
+            return keys.sort_values(["rank", "ts"], ascending=[True, False],
+                                    kind="stable", na_position="last").index
+        return ts.sort_values(ascending=False, kind="stable", na_position="last").index
+
+    def page(self, date_from=None, date_to=None, category=None, priority=None, search=None,
+             sort="newest", offset=0, limit=None, preview_chars=PREVIEW_CHARS):
+        df = self.query(date_from, date_to, category, priority, search)
+        total = len(df)
+        if total == 0:
+            return _page_frame(df.iloc[:0], preview_chars), 0
+        order = self._order(df, sort, search)
+        end = None if limit is None else offset + limit
+        return _page_frame(df.loc[order[offset:end]], preview_chars), total
+
+    def iter_pages(self, date_from=None, date_to=None, category=None, priority=None, search=None,
+                   sort="newest", chunk_rows=5000):
+        # The query result is shared with page(); only the order index and one
+        # chunk's copy are extra.
+        df = self.query(date_from, date_to, category, priority, search)
+        if len(df) == 0:
+            yield _page_frame(df.iloc[:0], None)
+            return
+        order = self._order(df, sort, search)
+        for start in range(0, len(order), chunk_rows):
+            yield _page_frame(df.loc[order[start:start + chunk_rows]], None)
+
+    def get(self, ticket_id: int) -> Optional[Dict[str, object]]:
+        hot = self._hot()
+        if ticket_id in hot.index:
+            row = hot.loc[ticket_id]
+        else:
+            row = self.archive.find(ticket_id)
+            if row is None:
+                return None
+        return {"id": ticket_id, **row.to_dict()}
+
+    def count(self) -> int:
+        return self.archive.rows + len(self._hot())
+
+    def date_bounds(self) -> DateBounds:
+        lo, hi = self.archive.bounds()
+        ts = self._hot()["timestamp"].dropna()
+        if len(ts):
+            lo = ts.min() if lo is None else min(lo, ts.min())
+            hi = ts.max() if hi is None else max(hi, ts.max())
+        if lo is None:
+            return None, None
+        return lo.date(), hi.date()
+
+    def distinct(self, column: str) -> List[str]:
+        return sorted(self.archive.distinct(column) | set(self._hot()[column].unique()))
+
+    def stats(self) -> Dict[str, int]:
+        return {**self.cache.stats(), **self.archive.stats()}
+
+
+# --- SQLite ---
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS tickets (
+    id INTEGER PRIMARY KEY,
+    {", ".join(f"{h} TEXT NOT NULL DEFAULT ''" for h in CSV_HEADERS)}
+);
+CREATE INDEX IF NOT EXISTS idx_tickets_timestamp ON tickets(timestamp);
+CREATE INDEX IF NOT EXISTS idx_tickets_category ON tickets(category, timestamp);
+CREATE INDEX IF NOT EXISTS idx_tickets_priority ON tickets(priority, timestamp);
+CREATE INDEX IF NOT EXISTS idx_tickets_email ON tickets(email);
+"""
+
+# External-content FTS5 index over the searchable columns, kept in sync by triggers
+_FTS_COLS = ", ".join(SEARCH_FIELDS)
+_NEW_COLS = ", ".join(f"new.{c}" for c in SEARCH_FIELDS)
+_OLD_COLS = ", ".join(f"old.{c}" for c in SEARCH_FIELDS)
+FTS_SCHEMA = f"""
+CREATE VIRTUAL TABLE tickets_fts USING fts5(
+    {_FTS_COLS}, content='tickets', content_rowid='id'
+);
+CREATE TRIGGER tickets_fts_ai AFTER INSERT ON tickets BEGIN
+    INSERT INTO tickets_fts(rowid, {_FTS_COLS}) VALUES (new.id, {_NEW_COLS});
+END;
+CREATE TRIGGER tickets_fts_ad AFTER DELETE ON tickets BEGIN
+    INSERT INTO tickets_fts(tickets_fts, rowid, {_FTS_COLS}) VALUES ('delete', old.id, {_OLD_COLS});
+END;
+CREATE TRIGGER tickets_fts_au AFTER UPDATE ON tickets BEGIN
+    INSERT INTO tickets_fts(tickets_fts, rowid, {_FTS_COLS}) VALUES ('delete', old.id, {_OLD_COLS});
+    INSERT INTO tickets_fts(rowid, {_FTS_COLS}) VALUES (new.id, {_NEW_COLS});
+END;
+INSERT INTO tickets_fts(tickets_fts) VALUES ('rebuild');
+"""
+
+
+class SqliteStore(TicketStore):
+    name = "sqlite"
+
+    def __init__(self, path: str, headers: List[str] = CSV_HEADERS):
+        self.path = path
+        self.headers = list(headers)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.executescript(SCHEMA)
+            has_fts = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'tickets_fts'"
+            ).fetchone()
+            if not has_fts:
+                # New DB, or one created before search existed: build from existing rows
+                conn.executescript(FTS_SCHEMA)
+        self.rollups = Rollups(path, self.headers)
+        if self.rollups.rows() != self.count():
+            cur = self._conn().execute("SELECT timestamp, email, category, priority FROM tickets")
+            self.rollups.rebuild(cur, conn=self._conn())
+
+    def _conn(self) -> sqlite3.Connection:
+        # Streamlit runs each session on its own thread; give each a connection
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=FULL")  # a committed ticket survives power loss
+            self._local.conn = conn
+        return conn
+
+    def _clean(self, row: List[str]) -> List[str]:
+        row = [("" if v is None else str(v)) for v in row]
+        row += [""] * (len(self.headers) - len(row))
+        rec = dict(zip(self.headers, row))
+        rec["category"] = rec["category"].strip()
+        rec["priority"] = rec["priority"].strip()
+        return [rec[h] for h in self.headers]
+
+    def append_many(self, rows: List[List[str]], ids: Optional[List[int]] = None) -> None:
+        """Insert `rows`; `ids` (migrations) keeps existing ticket ids instead of the next free ones."""
+        cols = ", ".join(self.headers)
+        marks = ", ".join("?" for _ in self.headers)
+        rows = [self._clean(r) for r in rows]
+        with self._conn() as conn:  # tickets and rollups commit together
+            if ids is None:
+                conn.executemany(f"INSERT INTO tickets ({cols}) VALUES ({marks})", rows)
+            else:
+                conn.executemany(f"INSERT INTO tickets (id, {cols}) VALUES (?, {marks})",
+                                 ([int(i)] + r for i, r in zip(ids, rows)))
+            self.rollups.apply(rows, conn=conn)
+
+    def _where(self, date_from, date_to, category, priority, search) -> Tuple[str, List[str], bool]:
+        """FROM/WHERE clause and parameters for the filters; True if it is a search."""
+        where, params = [], []
+        lo, hi = _day_bounds(date_from, date_to)
+        if lo is not None:
+            where.append("t.timestamp >= ?"); params.append(lo)
+        if hi is not None:
+            where.append("t.timestamp < ?"); params.append(hi)
+        if category is not None:
+            where.append("t.category = ?"); params.append(category)
+        if priority is not None:
+            where.append("t.priority = ?"); params.append(priority)
+        match = fts_query(search) if search else ""
+        if match:
+            sql = "FROM tickets_fts JOIN tickets t ON t.id = tickets_fts.rowid"
+            where.insert(0, "tickets_fts MATCH ?"); params.insert(0, match)
+        else:
+            sql = "FROM tickets t"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        return sql, params, bool(match)
+
+    def query(self, date_from=None, date_to=None, category=None, priority=None,
+              search=None) -> pd.DataFrame:
+        import pandas as pd
+        from_sql, params, searching = self._where(date_from, date_to, category, priority, search)
+        cols = ", ".join(f"t.{h}" for h in self.headers)
+        order = "bm25(tickets_fts), t.id DESC" if searching else "t.id"
+        sql = f"SELECT {cols} {from_sql} ORDER BY {order}"
+        return normalize(pd.read_sql_query(sql, self._conn(), params=params))
+
+    def _select(self, from_sql: str, searching: bool, sort: str, preview_chars: Optional[int]) -> str:
+        """SELECT ... ORDER BY for page() / iter_pages()."""
+        if sort == "relevance" and searching:
+            order = "bm25(tickets_fts), t.id DESC"
+        elif sort == "oldest":
+            order = "t.timestamp ASC, t.id ASC"
+        elif sort == "priority":
+            ranks = " ".join(f"WHEN '{p}' THEN {r}" for p, r in PRIORITY_RANK.items())
+            order = f"CASE t.priority {ranks} ELSE {len(PRIORITY_RANK)} END, t.timestamp DESC, t.id DESC"
+        else:
+            order = "t.timestamp DESC, t.id DESC"
+
+        cols = ["t.id"]
+        for h in self.headers:
+            if h == "message" and preview_chars is not None:
+                # One extra character tells truncate() the text was cut
+                cols.append(f"substr(t.message, 1, {int(preview_chars) + 1}) AS message")
+            else:
+                cols.append(f"t.{h}")
+        return f"SELECT {', '.join(cols)} {from_sql} ORDER BY {order}"
+
+    def page(self, date_from=None, date_to=None, category=None, priority=None, search=None,
+             sort="newest", offset=0, limit=None, preview_chars=PREVIEW_CHARS):
+        import pandas as pd
+        from_sql, params, searching = self._where(date_from, date_to, category, priority, search)
+        total = self._conn().execute(f"SELECT COUNT(*) {from_sql}", params).fetchone()[0]
+        sql = self._select(from_sql, searching, sort, preview_chars)
+        page_params = list(params)
+        if limit is not None:
+            sql += " LIMIT ? OFFSET ?"
+            page_params += [int(limit), int(offset)]
+        elif offset:
+            sql += " LIMIT -1 OFFSET ?"
+            page_params.append(int(offset))
+        df = normalize(pd.read_sql_query(sql, self._conn(), params=page_params))
+        return _page_frame(df, preview_chars), total
+
+    def iter_pages(self, date_from=None, date_to=None, category=None, priority=None, search=None,
+                   sort="newest", chunk_rows=5000):
+        import pandas as pd
+        from_sql, params, searching = self._where(date_from, date_to, category, priority, search)
+        sql = self._select(from_sql, searching, sort, None)
+        # One cursor, fetched chunk_rows at a time (an empty result still yields one frame)
+        for chunk in pd.read_sql_query(sql, self._conn(), params=list(params), chunksize=chunk_rows):
+            yield _page_frame(normalize(chunk), None)
+
+    def get(self, ticket_id: int) -> Optional[Dict[str, object]]:
+        import pandas as pd
+        df = pd.read_sql_query(f"SELECT id, {', '.join(self.headers)} FROM tickets WHERE id = ?",
+                               self._conn(), params=[int(ticket_id)])
+        if df.empty:
+            return None
+        return normalize(df).iloc[0].to_dict()
+
+    def count(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM tickets").fetchone()[0]
+
+    def date_bounds(self) -> DateBounds:
+        lo, hi = self._conn().execute(
+            "SELECT MIN(timestamp), MAX(timestamp) FROM tickets WHERE timestamp != ''"
+        ).fetchone()
+        if not lo:
+            return None, None
+        return date.fromisoformat(lo[:10]), date.fromisoformat(hi[:10])
+
+    def distinct(self, column: str) -> List[str]:
+        if column not in self.headers:
+            raise ValueError(f"unknown column: {column}")
+        rows = self._conn().execute(f"SELECT DISTINCT {column} FROM tickets").fetchall()
+        return sorted(r[0] for r in rows)
+
+
+def open_store(backend: str, csv_path: str, sqlite_path: str) -> TicketStore:
+    backend = (backend or "csv").strip().lower()
+    if backend == "csv":
+        return CsvStore(csv_path)
+    if backend == "sqlite":
+        return SqliteStore(sqlite_path)
+    raise ValueError(f"Unknown STORAGE_BACKEND: {backend!r} (expected 'csv' or 'sqlite')")
+
+
+# --- Migration ---
+def iter_csv_rows(path: str, headers: List[str] = CSV_HEADERS, skip: int = 0) -> Iterable[List[str]]:
+    with open(path, newline="", encoding="utf-8") as f:
+        for i, rec in enumerate(csv.DictReader(f)):
+            if i >= skip:
+                yield [rec.get(h) or "" for h in headers]
+
+
+def iter_store_rows(csv_path: str, headers: List[str] = CSV_HEADERS) -> Iterable[Tuple[int, List[str]]]:
+    """(ticket id, row) for every ticket of a CSV store: archived segments, then the live CSV."""
+    archive = Archive(os.path.join(os.path.dirname(csv_path) or ".", "archive"), headers)
+    yield from archive.iter_rows()
+    manifest = archive.manifest()
+    pending = manifest.get("pending_trim")
+    skip = pending["rows"] if pending and os.stat(csv_path).st_ino == pending["inode"] else 0
+    yield from enumerate(iter_csv_rows(csv_path, headers, skip=skip), start=manifest["archived_rows"])
+
+
+def migrate_csv(csv_path: str, db_path: str, batch_size: int = 10_000) -> int:
+    """Import every row of csv_path into the SQLite store at db_path.
+
+    Tickets keep their CSV ids (so "#123" means the same ticket on both
+    backends); new SQLite tickets continue after the highest one.
+    """
+    store = SqliteStore(db_path)
+    if store.count():
+        raise SystemExit(f"{db_path} already has tickets; refusing to import twice.")
+    total, ids, batch = 0, [], []
+    for ticket_id, row in iter_store_rows(csv_path):
+        ids.append(ticket_id)
+        batch.append(row)
+        if len(batch) >= batch_size:
+            store.append_many(batch, ids=ids)
+            total += len(batch)
+            ids, batch = [], []
+    if batch:
+        store.append_many(batch, ids=ids)
+        total += len(batch)
+    return total
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="SupportDesk storage tools")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    mig = sub.add_parser("migrate", help="import submissions.csv into SQLite")
+    mig.add_argument("--csv", default=os.path.join("data", "submissions.csv"))
+    mig.add_argument("--db", default=os.path.join("data", "tickets.db"))
+    comp = sub.add_parser("compact", help="move old submissions.csv rows into the Parquet archive")
+    comp.add_argument("--csv", default=os.path.join("data", "submissions.csv"))
+    comp.add_argument("--before", type=date.fromisoformat, default=None,
+                      help="archive rows before this date (default: keep ARCHIVE_AFTER_MONTHS months live)")
+    args = parser.parse_args(argv)
+
+    if args.cmd == "migrate":
+        n = migrate_csv(args.csv, args.db)
+        print(f"Imported {n} tickets from {args.csv} into {args.db}")
+    elif args.cmd == "compact":
+        store = CsvStore(args.csv)
+        if not store.archive.enabled:
+            raise SystemExit("Compaction needs pyarrow (pip install pyarrow).")
+        n = store.compact(args.before)
+        print(f"Archived {n} tickets; {store.archive.stats()}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,164 @@
+# CSV archive compaction: ids, crash recovery, appends during the trim, and
+# migration to SQLite afterwards. Needs pyarrow, like compaction itself.
+#
+#   python -m pytest tests
+
+import json
+import os
+from datetime import date
+
+import pytest
+
+pytest.importorskip("pyarrow")
+
+import storage  # noqa: E402
+from storage import CsvStore, SqliteStore, migrate_csv  # noqa: E402
+
+
+def ticket(ts: str, subject: str, message: str = "m") -> list:
+    return [ts, "Jane", "jane@example.com", "Question", "Normal", "", subject, message, "", "", ""]
+
+
+# Jan..Jun, a late January row between February and March, an undated row and
+# messages with quotes and newlines (a CSV record spanning several lines)
+ROWS = [
+    ticket("2024-01-05T10:00:00Z", "jan 1"),
+    ticket("2024-01-20T10:00:00Z", "jan 2", 'line one\n"quoted", line two'),
+    ticket("2024-02-03T10:00:00Z", "feb 1"),
+    ticket("2024-01-28T10:00:00Z", "jan late"),
+    ticket("2024-03-11T10:00:00Z", "mar 1", "a\r\nb"),
+    ticket("not a date", "undated"),
+    ticket("2024-04-02T10:00:00Z", "apr 1"),
+    ticket("2024-05-19T10:00:00Z", "may 1", '""'),
+    ticket("2024-06-30T10:00:00Z", "jun 1"),
+]
+
+
+def snapshot(store) -> dict:
+    """Every ticket by id, values as strings (NaT != NaT otherwise)."""
+    out = {}
+    for i in range(store.count() + 2):  # ids past the end must stay unknown
+        rec = store.get(i)
+        out[i] = None if rec is None else {k: str(v) for k, v in rec.items()}
+    return out
+
+
+def csv_records(path: str) -> int:
+    import csv
+    with open(path, newline="", encoding="utf-8") as f:
+        return sum(1 for _ in csv.reader(f)) - 1
+
+
+@pytest.fixture
+def store(tmp_path):
+    s = CsvStore(str(tmp_path / "submissions.csv"))
+    s.append_many(ROWS)
+    return s
+
+
+def test_compact_keeps_ids(store):
+    before = snapshot(store)
+    archived = store.compact(date(2024, 4, 1))
+
+    # Leading run of rows before April (the undated one included) moves
+    assert archived == 6
+    assert store.archive.rows == 6
+    assert csv_records(store.path) == len(ROWS) - 6
+    assert snapshot(store) == before
+    assert snapshot(CsvStore(store.path)) == before  # a fresh process sees the same
+    assert store.rollups.rows() == len(ROWS)
+
+    ids = store.page(sort="oldest", limit=None)[0]["id"].tolist()
+    assert sorted(ids) == list(range(len(ROWS)))
+
+    store.append(ticket("2024-07-01T10:00:00Z", "jul 1"))
+    assert store.get(len(ROWS))["subject"] == "jul 1"
+    assert store.compact(date(2024, 4, 1)) == 0
+
+
+def test_compact_again_rewrites_segment_under_new_name(store):
+    store.compact(date(2024, 2, 1))  # jan 1, jan 2
+    first = store.archive.manifest()["segments"]["2024-01"]["file"]
+    store.compact(date(2024, 4, 1))  # ... and the late January row
+    manifest = store.archive.manifest()
+    assert manifest["segments"]["2024-01"]["file"] != first
+    assert manifest["segments"]["2024-01"]["rows"] == 3
+    store.compact(date(2024, 4, 1))  # the next compaction removes the replaced file
+    assert not os.path.exists(os.path.join(store.archive.directory, first))
+
+
+def test_interrupted_before_trim(store):
+    before = snapshot(store)
+    # Crash between writing the segments and trimming the CSV
+    hot = store._hot()
+    store.archive.append(hot.iloc[:3], {"inode": os.stat(store.path).st_ino, "rows": 3})
+
+    assert snapshot(store) == before  # pending rows are skipped, not shown twice
+    assert store.count() == len(ROWS)
+
+    reopened = CsvStore(store.path)
+    assert snapshot(reopened) == before
+    assert reopened.archive.manifest()["pending_trim"] is None
+    assert csv_records(store.path) == len(ROWS) - 3
+    assert reopened.compact(date(2024, 4, 1)) == 3  # carries on from there
+    assert snapshot(reopened) == before
+
+
+def test_interrupted_after_trim(store):
+    before = snapshot(store)
+    old_inode = os.stat(store.path).st_ino
+    n = store.compact(date(2024, 4, 1))
+    # Crash after the trimmed CSV replaced the old one but before the
+    # manifest's pending_trim was cleared: the trim must not run twice
+    with open(store.archive.manifest_path, encoding="utf-8") as f:
+        manifest = json.load(f)
+    manifest["pending_trim"] = {"inode": old_inode, "rows": n}
+    with open(store.archive.manifest_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+
+    reopened = CsvStore(store.path)
+    assert snapshot(reopened) == before
+    assert csv_records(store.path) == len(ROWS) - n
+
+
+def test_append_during_trim_is_kept(store, monkeypatch):
+    other = CsvStore(store.path)  # another process appending meanwhile
+    copy = storage._copy_bytes
+    calls = []
+
+    def copy_then_append(src, dst, size, *args):
+        if not calls:  # while the surviving rows are copied without the lock
+            other.append(ticket("2024-08-01T10:00:00Z", "during trim", "x\ny"))
+        calls.append(size)
+        copy(src, dst, size, *args)
+
+    monkeypatch.setattr(storage, "_copy_bytes", copy_then_append)
+    before = snapshot(store)
+    assert store.compact(date(2024, 4, 1)) == 6
+    assert calls[-1] is None  # the tail was copied under the append lock
+
+    after = snapshot(CsvStore(store.path))
+    new_id = len(ROWS)
+    assert after[new_id]["subject"] == "during trim"
+    assert after[new_id]["message"] == "x\ny"
+    assert {i: v for i, v in after.items() if i < new_id} == {i: v for i, v in before.items() if i < new_id}
+    assert csv_records(store.path) == len(ROWS) - 6 + 1
+
+
+def test_migrate_after_compaction_keeps_ids(store, tmp_path):
+    store.compact(date(2024, 2, 1))
+    store.compact(date(2024, 4, 1))  # January segment now has a higher id than February's
+    db = str(tmp_path / "tickets.db")
+    assert migrate_csv(store.path, db) == len(ROWS)
+    sql = SqliteStore(db)
+
+    for i in range(len(ROWS)):
+        csv_rec, sql_rec = store.get(i), sql.get(i)
+        for field in ("subject", "message", "email", "category"):
+            assert str(sql_rec[field]) == str(csv_rec[field]), (i, field)
+    assert sql.get(len(ROWS)) is None
+
+    store.append(ticket("2024-07-01T10:00:00Z", "next"))
+    sql.append(ticket("2024-07-01T10:00:00Z", "next"))
+    assert sql.get(len(ROWS))["subject"] == store.get(len(ROWS))["subject"] == "next"
+    assert sql.rollups.rows() == len(ROWS) + 1
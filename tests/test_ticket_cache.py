@@ -0,0 +1,130 @@
+# TicketCache: record splitting on append boundaries and the choice between
+# an incremental tail parse and a full reload.
+
+import csv
+import io
+import os
+
+from storage import CSV_HEADERS
+from ticket_cache import TicketCache, _safe_end
+
+
+def record(subject: str, message: str = "m") -> bytes:
+    buf = io.StringIO()
+    csv.writer(buf).writerow(["2024-01-05T10:00:00Z", "Jane", "jane@example.com", "Question",
+                              "Normal", "", subject, message, "", "", ""])
+    return buf.getvalue().encode("utf-8")
+
+
+def header() -> bytes:
+    buf = io.StringIO()
+    csv.writer(buf).writerow(CSV_HEADERS)
+    return buf.getvalue().encode("utf-8")
+
+
+def append(path, data: bytes) -> None:
+    with open(path, "ab") as f:
+        f.write(data)
+
+
+def subjects(cache: TicketCache) -> list:
+    return cache.load()["subject"].tolist()
+
+
+def test_safe_end():
+    one, two = record("a"), record("b", 'says "hi",\nthen\r\nbye')
+    assert _safe_end(b"") == 0
+    assert _safe_end(one) == len(one)
+    assert _safe_end(one + two) == len(one + two)
+    assert _safe_end(one + two[:-1]) == len(one)  # missing the final newline
+    cut = two.index(b"\n")  # inside the quoted message
+    assert _safe_end(one + two[:cut + 1]) == len(one)
+    assert _safe_end(two[:cut + 1]) == 0
+
+
+def test_partial_trailing_record(tmp_path):
+    path = tmp_path / "s.csv"
+    path.write_bytes(header() + record("a"))
+    cache = TicketCache(str(path), CSV_HEADERS)
+    assert subjects(cache) == ["a"]
+    generation = cache.generation
+
+    rec = record("b")
+    append(path, rec[:10])  # a writer is half way through
+    assert subjects(cache) == ["a"]
+    append(path, rec[10:])
+    assert subjects(cache) == ["a", "b"]
+    assert cache.generation == generation  # picked up without a reload
+    assert cache.incremental == 1
+
+
+def test_quoted_multiline_message_split_across_appends(tmp_path):
+    path = tmp_path / "s.csv"
+    path.write_bytes(header())
+    cache = TicketCache(str(path), CSV_HEADERS)
+    assert subjects(cache) == []
+
+    message = 'first line\n"quoted", second line\nthird'
+    rec = record("multi", message)
+    cut = rec.index(b"\n") + 1  # ends on a newline inside the quotes
+    append(path, rec[:cut])
+    assert subjects(cache) == []
+    append(path, rec[cut:] + record("next"))
+    df = cache.load()
+    assert df["subject"].tolist() == ["multi", "next"]
+    assert df["message"].iloc[0] == message
+    assert cache.rows_parsed == 2
+
+
+def test_truncation_forces_full_reload(tmp_path):
+    path = tmp_path / "s.csv"
+    path.write_bytes(header() + record("a") + record("b") + record("c"))
+    cache = TicketCache(str(path), CSV_HEADERS)
+    assert subjects(cache) == ["a", "b", "c"]
+    generation = cache.generation
+
+    with open(path, "r+b") as f:  # same inode, shorter file
+        f.truncate(len(header() + record("a")))
+    assert subjects(cache) == ["a"]
+    assert cache.generation == generation + 1
+
+
+def test_rewrite_in_place_forces_full_reload(tmp_path):
+    path = tmp_path / "s.csv"
+    path.write_bytes(header() + record("a"))
+    cache = TicketCache(str(path), CSV_HEADERS)
+    assert subjects(cache) == ["a"]
+    generation = cache.generation
+
+    with open(path, "r+b") as f:  # same inode, consumed bytes changed, then grown
+        f.write(header() + record("x"))
+        f.write(record("y"))
+    assert subjects(cache) == ["x", "y"]
+    assert cache.generation == generation + 1
+
+
+def test_inode_swap_forces_full_reload(tmp_path):
+    path = tmp_path / "s.csv"
+    path.write_bytes(header() + record("a") + record("b"))
+    cache = TicketCache(str(path), CSV_HEADERS)
+    assert subjects(cache) == ["a", "b"]
+    generation = cache.generation
+
+    # Same size and mtime: only the inode tells the files apart
+    old = os.stat(path)
+    tmp = tmp_path / "s.csv.tmp"
+    tmp.write_bytes(header() + record("a") + record("c"))
+    os.utime(tmp, ns=(old.st_atime_ns, old.st_mtime_ns))
+    os.replace(tmp, path)
+    assert subjects(cache) == ["a", "c"]
+    assert cache.generation == generation + 1
+
+    append(path, record("d"))
+    assert subjects(cache) == ["a", "c", "d"]
+    assert cache.generation == generation + 1
+
+
+def test_missing_file(tmp_path):
+    cache = TicketCache(str(tmp_path / "none.csv"), CSV_HEADERS)
+    df = cache.load()
+    assert len(df) == 0 and list(df.columns) == CSV_HEADERS
@@ -0,0 +1,183 @@
+# Process-wide ticket cache for SupportDesk.
+#
+# submissions.csv is append-only, so after the first full parse we only need to
+# read the bytes written since the last look. The cache remembers the byte
+# offset it has consumed plus the file's size/mtime/inode and a fingerprint of
+# the first and last consumed bytes. A rerun then costs one os.stat() when
+# nothing changed, a small tail parse when rows were appended, and a full
+# reload only when the file was truncated or rewritten.
+#
+# pandas is imported on first load() rather than at import time, so sessions
+# that only submit tickets never pay for it.
+
+from __future__ import annotations
+
+import io
+import os
+import threading
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+FINGERPRINT_BYTES = 4096
+
+
+def _safe_end(buf: bytes) -> int:
+    """Length of the longest prefix of `buf` made of complete CSV records.
+
+    A record ends at a newline that is not inside a quoted field. The csv
+    module escapes quotes by doubling them, so a newline is outside quotes
+    exactly when the number of quote characters before it is even.
+    """
+    end = buf.rfind(b"\n")
+    while end != -1 and buf.count(b'"', 0, end + 1) % 2:
+        end = buf.rfind(b"\n", 0, end)
+    return end + 1
+
+
+def normalize(df: pd.DataFrame) -> pd.DataFrame:
+    """Apply the display normalization the staff tab expects."""
+    import pandas as pd
+    for col in df.columns:
+        if col != "timestamp":
+            df[col] = df[col].fillna("")
+    # Normalize category / priority
+    for col in ("category", "priority"):
+        if col in df.columns:
+            df[col] = df[col].astype(str).str.strip()
+    # Normalize timestamp to datetime for filtering/sorting
+    if "timestamp" in df.columns:
+        df["timestamp"] = pd.to_datetime(df["timestamp"], errors="coerce", utc=True)
+    return df
+
+
+class TicketCache:
+    """Shared, incrementally refreshed view of submissions.csv."""
+
+    def __init__(self, path: str, headers: List[str]):
+        self.path = path
+        self.headers = list(headers)
+        self._lock = threading.Lock()
+        self._df: Optional[pd.DataFrame] = None
+        self._columns: List[str] = list(headers)
+        self._offset = 0
+        self._size = -1
+        self._mtime_ns = -1
+        self._inode = -1
+        self._head = b""
+        self._tail = b""
+        self.hits = 0
+        self.misses = 0
+        self.incremental = 0
+        self.rows_parsed = 0
+        self.generation = 0  # bumped on every full reload; row positions restart
+
+    # --- public API ---
+    def load(self) -> pd.DataFrame:
+        """Return the current tickets frame. Callers must not mutate it."""
+        with self._lock:
+            self._refresh()
+            return self._df
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "incremental": self.incremental,
+            "rows": 0 if self._df is None else len(self._df),
+            "rows_parsed": self.rows_parsed,
+            "offset": self._offset,
+        }
+
+    # --- internals ---
+    def _refresh(self) -> None:
+        try:
+            st_ = os.stat(self.path)
+        except FileNotFoundError:
+            self._reset_empty()
+            self.misses += 1
+            return
+
+        if self._df is None or st_.st_ino != self._inode or st_.st_size < self._offset:
+            self._full_load(st_)
+            return
+
+        if st_.st_size == self._size and st_.st_mtime_ns == self._mtime_ns:
+            self.hits += 1
+            return
+
+        with open(self.path, "rb") as f:
+            if not self._same_prefix(f):
+                self._full_load(st_)
+                return
+            f.seek(self._offset)
+            chunk = f.read(st_.st_size - self._offset)
+
+        end = _safe_end(chunk)
+        if end:
+            import pandas as pd
+            new = self._parse(chunk[:end], header=False)
+            if len(new):
+                self._df = pd.concat([self._df, new], ignore_index=True)
+            self._offset += end
+            self._tail = (self._tail + chunk[:end])[-FINGERPRINT_BYTES:]
+            if len(self._head) < FINGERPRINT_BYTES:
+                self._head = (self._head + chunk[:end])[:FINGERPRINT_BYTES]
+            self.incremental += 1
+        else:
+            # Only a partially written record so far; pick it up next time
+            self.hits += 1
+        self._remember(st_)
+
+    def _same_prefix(self, f) -> bool:
+        """Cheap check that the bytes we already consumed were not rewritten."""
+        head = f.read(len(self._head))
+        if head != self._head:
+            return False
+        f.seek(self._offset - len(self._tail))
+        return f.read(len(self._tail)) == self._tail
+
+    def _full_load(self, st_: os.stat_result) -> None:
+        self.misses += 1
+        self.generation += 1
+        with open(self.path, "rb") as f:
+            buf = f.read(st_.st_size)
+        if not buf:
+            self._reset_empty()
+            self._remember(st_)
+            return
+        end = _safe_end(buf)
+        df = self._parse(buf[:end], header=True)
+        self._df = df
+        self._columns = list(df.columns)
+        self._offset = end
+        self._head = buf[:min(end, FINGERPRINT_BYTES)]
+        self._tail = buf[max(0, end - FINGERPRINT_BYTES):end]
+        self._remember(st_)
+
+    def _parse(self, data: bytes, header: bool) -> pd.DataFrame:
+        import pandas as pd
+        if not data.strip():
+            return pd.DataFrame(columns=self._columns)
+        if header:
+            df = pd.read_csv(io.BytesIO(data), dtype=str, keep_default_na=False)
+        else:
+            df = pd.read_csv(io.BytesIO(data), header=None, names=self._columns,
+                             dtype=str, keep_default_na=False)
+        self.rows_parsed += len(df)
+        return normalize(df)
+
+    def _reset_empty(self) -> None:
+        import pandas as pd
+        self.generation += 1
+        self._df = normalize(pd.DataFrame(columns=self.headers))
+        self._columns = list(self.headers)
+        self._offset = 0
+        self._head = b""
+        self._tail = b""
+
+    def _remember(self, st_: os.stat_result) -> None:
+        self._size = st_.st_size
+        self._mtime_ns = st_.st_mtime_ns
+        self._inode = st_.st_ino
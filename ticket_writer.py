@@ -0,0 +1,117 @@
+# Single writer thread for ticket submissions.
+#
+# Sessions hand rows to TicketWriter.submit(); one background thread drains the
+# queue and writes whatever has piled up as one batch via store.append_many()
+# (one locked, fsync'd append for CSV; one transaction for SQLite). Each
+# caller gets a Future that resolves once its batch is durably on disk, so a
+# burst of N submissions costs a handful of fsyncs instead of N.
+#
+# A row whose caller gave up waiting (write() timed out) before its batch
+# started is cancelled and never written, so "could not be saved" stays true
+# and a retry cannot duplicate the ticket.
+
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from typing import Dict, List, Tuple
+
+from storage import TicketStore
+
+_STOP = object()
+
+
+class TicketWriter:
+    def __init__(self, store: TicketStore, max_batch: int = 500, linger: float = 0.002):
+        self.store = store
+        self.max_batch = max_batch
+        self.linger = linger  # how long to wait for more rows once one arrives
+        self._queue: "queue.Queue" = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self.rows_written = 0
+        self.batches = 0
+        self.failures = 0
+        self.cancelled = 0
+        self._thread = threading.Thread(target=self._run, name="ticket-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, row: List[str]) -> Future:
+        """Queue a row; the Future resolves when it has been durably written."""
+        fut: Future = Future()
+        self._queue.put((row, fut))
+        return fut
+
+    def write(self, row: List[str], timeout: float = 30.0) -> None:
+        """Queue a row and wait for its batch to hit the disk.
+
+        Raises TimeoutError if the row was still queued after `timeout`; it is
+        then dropped. A row whose batch is already being written is waited for.
+        """
+        fut = self.submit(row)
+        try:
+            fut.result(timeout=timeout)
+        except FutureTimeout:
+            if fut.cancel():
+                raise
+            fut.result()
+
+    def stats(self) -> Dict[str, int]:
+        with self._stats_lock:
+            return {
+                "queued": self._queue.qsize(),
+                "rows_written": self.rows_written,
+                "batches": self.batches,
+                "failures": self.failures,
+                "cancelled": self.cancelled,
+            }
+
+    def close(self, timeout: float = 30.0) -> None:
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    # --- writer thread ---
+    def _drain(self, first) -> Tuple[List[Tuple[List[str], Future]], bool]:
+        batch, stop = [first], False
+        deadline = time.monotonic() + self.linger
+        while len(batch) < self.max_batch:
+            try:
+                item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+            if item is _STOP:
+                stop = True
+                break
+            batch.append(item)
+        return batch, stop
+
+    def _run(self) -> None:
+        while True:
+            first = self._queue.get()
+            if first is _STOP:
+                return
+            batch, stop = self._drain(first)
+            # Claim the rows; ones whose caller already gave up are dropped
+            live = [(row, fut) for row, fut in batch if fut.set_running_or_notify_cancel()]
+            if len(live) < len(batch):
+                with self._stats_lock:
+                    self.cancelled += len(batch) - len(live)
+            batch = live
+            if not batch:
+                if stop:
+                    return
+                continue
+            try:
+                self.store.append_many([row for row, _ in batch])
+            except Exception as exc:  # report to every waiting caller
+                with self._stats_lock:
+                    self.failures += len(batch)
+                for _, fut in batch:
+                    fut.set_exception(exc)
+            else:
+                with self._stats_lock:
+                    self.rows_written += len(batch)
+                    self.batches += 1
+                for _, fut in batch:
+                    fut.set_result(None)
+            if stop:
+                return